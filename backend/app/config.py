@@ -3,7 +3,7 @@ Application configuration using pydantic-settings.
 
 All configuration values can be set via environment variables or .env file.
 """
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -24,6 +24,9 @@ class Settings(BaseSettings):
         env_file_encoding="utf-8",
         case_sensitive=False,
         extra="ignore",
+        # Settings are read-only after startup; override via env vars or
+        # get_settings.cache_clear() instead of assigning attributes
+        frozen=True,
     )
 
     # ===========================================
@@ -34,19 +37,25 @@ class Settings(BaseSettings):
     app_description: str = "XML transformation, validation, and Peppol lookup services"
     debug: bool = False
     log_level: str = "INFO"
+    enable_legacy_routes: bool = True  # unversioned /api/lookup, /api/validation
 
     # ===========================================
     # CORS
     # ===========================================
-    cors_origins: list[str] = Field(default=["*"])
-    cors_allow_methods: list[str] = Field(default=["*"])
-    cors_allow_headers: list[str] = Field(default=["*"])
+    cors_origins: tuple[str, ...] = ("*",)
+    cors_allow_methods: tuple[str, ...] = ("*",)
+    cors_allow_headers: tuple[str, ...] = ("*",)
 
     # ===========================================
     # Rate Limiting
     # ===========================================
+    enable_rate_limiting: bool = True
     rate_limit_validation: str = "10/minute"
     rate_limit_lookup: str = "30/minute"
+    # Counter storage shared by all workers, e.g. "redis://redis:6379/0".
+    # The in-memory default counts per process, so N workers allow N x the limit.
+    rate_limit_storage_uri: str = "memory://"
+    rate_limit_strategy: str = "fixed-window"
 
     # ===========================================
     # Peppol Directory / Lookup
@@ -63,7 +72,7 @@ class Settings(BaseSettings):
     use_test_sml: bool = False
 
     # Lookup defaults
-    lookup_fallback_icds: list[str] = Field(default=["0106", "0199", "0060"])
+    lookup_fallback_icds: tuple[str, ...] = ("0106", "0199", "0060")
     lookup_max_retries: int = 5
     lookup_base_backoff: float = 0.5
 
@@ -72,34 +81,44 @@ class Settings(BaseSettings):
     # ===========================================
     base_dir: Path = Field(default_factory=lambda: Path(__file__).resolve().parent.parent)
 
-    @property
+    # Derived paths never change after startup, so compute each one once
+    @cached_property
     def schemas_dir(self) -> Path:
         return self.base_dir / "schemas"
 
-    @property
+    @cached_property
     def xsd_dir(self) -> Path:
         return self.schemas_dir / "xsd"
 
-    @property
+    @cached_property
     def schematron_dir(self) -> Path:
         return self.schemas_dir / "schematron"
 
-    @property
+    @cached_property
     def rules_dir(self) -> Path:
         return self.schemas_dir / "rules"
 
-    @property
+    @cached_property
     def mappers_dir(self) -> Path:
         return self.base_dir / "mappers"
 
-    @property
+    @cached_property
     def data_dir(self) -> Path:
         return self.base_dir / "data"
 
-    @property
+    @cached_property
     def codelists_dir(self) -> Path:
         return self.data_dir / "codelists"
 
+    # String forms for callers that join file names with os.path
+    @cached_property
+    def xsd_dir_str(self) -> str:
+        return str(self.xsd_dir)
+
+    @cached_property
+    def schematron_dir_str(self) -> str:
+        return str(self.schematron_dir)
+
     # ===========================================
     # Schema Sync Sources (can override URLs)
     # ===========================================
@@ -115,6 +134,8 @@ class Settings(BaseSettings):
     firebase_project_id: Optional[str] = None
     firebase_credentials_path: Optional[str] = None
     firebase_database_url: Optional[str] = None  # For Realtime Database (optional)
+    # Worker threads for blocking Firebase Admin SDK calls
+    firebase_executor_workers: int = 16
 
     # When running in GCP, credentials are auto-detected
     # Set this to use a specific service account
@@ -126,6 +147,8 @@ class Settings(BaseSettings):
     gcp_project_id: Optional[str] = None
     use_secret_manager: bool = False
     secret_cache_ttl_minutes: int = 5
+    # Secrets fetched concurrently at startup, e.g. '["HELGER_API_KEY"]'
+    preload_secret_names: tuple[str, ...] = ()
 
     # ===========================================
     # Logging Configuration
@@ -150,14 +173,19 @@ class Settings(BaseSettings):
     max_xslt_size_mb: int = 5
 
 
-@lru_cache()
+@lru_cache(maxsize=None)
 def get_settings() -> Settings:
     """
     Get cached settings instance.
 
     Settings are loaded once and cached for performance.
-    To reload settings (e.g., in tests), clear the cache:
+    The instance is frozen; to reload settings (e.g., in tests), change the
+    environment and clear the cache:
         get_settings.cache_clear()
+
+    Note that modules which bound ``settings`` at import keep the old
+    instance, so patch ``app.config.settings`` (or the importing module's
+    reference) when a test needs different values.
     """
     return Settings()
 
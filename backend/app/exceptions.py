@@ -2,11 +2,18 @@
 
 from fastapi import HTTPException, status
 
+# Status codes bound once so raising doesn't re-resolve them on the module
+_HTTP_400 = status.HTTP_400_BAD_REQUEST
+_HTTP_404 = status.HTTP_404_NOT_FOUND
+_HTTP_422 = status.HTTP_422_UNPROCESSABLE_ENTITY
+_HTTP_500 = status.HTTP_500_INTERNAL_SERVER_ERROR
+_HTTP_502 = status.HTTP_502_BAD_GATEWAY
+
 
 class PeppolAPIException(HTTPException):
     """Base exception for Peppol API errors."""
 
-    def __init__(self, detail: str, status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR):
+    def __init__(self, detail: str, status_code: int = _HTTP_500):
         super().__init__(status_code=status_code, detail=detail)
 
 
@@ -14,14 +21,14 @@ class ValidationError(PeppolAPIException):
     """Raised when validation fails due to invalid input."""
 
     def __init__(self, detail: str):
-        super().__init__(detail=detail, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        super().__init__(detail=detail, status_code=_HTTP_422)
 
 
 class TransformationError(PeppolAPIException):
     """Raised when XSLT transformation fails."""
 
     def __init__(self, detail: str):
-        super().__init__(detail=detail, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        super().__init__(detail=detail, status_code=_HTTP_422)
 
 
 class MapperNotFoundError(PeppolAPIException):
@@ -30,7 +37,7 @@ class MapperNotFoundError(PeppolAPIException):
     def __init__(self, mapper_name: str):
         super().__init__(
             detail=f"Mapper not found: {mapper_name}",
-            status_code=status.HTTP_404_NOT_FOUND
+            status_code=_HTTP_404
         )
 
 
@@ -40,7 +47,7 @@ class SchemeNotFoundError(PeppolAPIException):
     def __init__(self, icd: str):
         super().__init__(
             detail=f"Scheme not found: {icd}",
-            status_code=status.HTTP_404_NOT_FOUND
+            status_code=_HTTP_404
         )
 
 
@@ -48,7 +55,7 @@ class LookupError(PeppolAPIException):
     """Raised when Peppol lookup fails."""
 
     def __init__(self, detail: str):
-        super().__init__(detail=detail, status_code=status.HTTP_502_BAD_GATEWAY)
+        super().__init__(detail=detail, status_code=_HTTP_502)
 
 
 class ExternalServiceError(PeppolAPIException):
@@ -57,7 +64,7 @@ class ExternalServiceError(PeppolAPIException):
     def __init__(self, service: str, detail: str):
         super().__init__(
             detail=f"{service} service error: {detail}",
-            status_code=status.HTTP_502_BAD_GATEWAY
+            status_code=_HTTP_502
         )
 
 
@@ -65,4 +72,4 @@ class XMLParseError(PeppolAPIException):
     """Raised when XML parsing fails."""
 
     def __init__(self, detail: str):
-        super().__init__(detail=f"XML parse error: {detail}", status_code=status.HTTP_400_BAD_REQUEST)
+        super().__init__(detail=f"XML parse error: {detail}", status_code=_HTTP_400)
@@ -17,43 +17,93 @@ Usage:
     # Manual token verification
     user = verify_firebase_token(token)
 """
+import asyncio
 import logging
+import threading
 from functools import lru_cache
-from typing import Optional
+from typing import Literal, Optional
 
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from app.config import settings
+from app.token_cache import token_cache, token_cache_key
+
 logger = logging.getLogger(__name__)
 
+# firebase-admin is optional and heavy; it is imported by _load_firebase_admin()
+# only once Firebase is enabled, so disabled deployments never load it.
+firebase_admin = None
+firebase_auth = None
+credentials = None
+
+
+def _load_firebase_admin() -> bool:
+    """Import firebase-admin into module globals. Returns False if missing."""
+    global firebase_admin, firebase_auth, credentials
+
+    if firebase_admin is not None:
+        return True
+
+    try:
+        import firebase_admin as _firebase_admin
+        from firebase_admin import auth as _firebase_auth
+        from firebase_admin import credentials as _credentials
+    except ImportError:
+        return False
+
+    firebase_admin = _firebase_admin
+    firebase_auth = _firebase_auth
+    credentials = _credentials
+    return True
+
+
 # Firebase Admin SDK (lazy initialization)
+# State is one of "uninit", "ready", "disabled" or "failed"; once it leaves
+# "uninit" it is terminal and _firebase_app can be returned without locking.
 _firebase_app = None
+_firebase_state: Literal["uninit", "ready", "disabled", "failed"] = "uninit"
+_firebase_lock = threading.Lock()
 _firestore_client = None
 
 
 def _initialize_firebase():
-    """Initialize Firebase Admin SDK (lazy)."""
-    global _firebase_app
+    """Initialize Firebase Admin SDK (lazy, thread-safe, runs once)."""
+    global _firebase_app, _firebase_state
+
+    if _firebase_state != "uninit":
+        return _firebase_app
+
+    with _firebase_lock:
+        # Another thread may have finished initialization while we waited
+        if _firebase_state != "uninit":
+            return _firebase_app
 
-    if _firebase_app is not None:
+        _firebase_app, _firebase_state = _create_firebase_app()
         return _firebase_app
 
-    from app.config import get_settings
 
-    settings = get_settings()
+def _create_firebase_app():
+    """
+    Create the Firebase app from settings.
 
+    Returns:
+        Tuple of (app or None, resulting state)
+    """
     if not settings.firebase_enabled:
         logger.info("Firebase is disabled in settings")
-        return None
+        return None, "disabled"
 
-    try:
-        import firebase_admin
-        from firebase_admin import credentials
+    if not _load_firebase_admin():
+        logger.warning(
+            "firebase-admin not installed. Install with: pip install firebase-admin"
+        )
+        return None, "failed"
 
+    try:
         # Check if already initialized
         try:
-            _firebase_app = firebase_admin.get_app()
-            return _firebase_app
+            return firebase_admin.get_app(), "ready"
         except ValueError:
             pass  # Not initialized yet
 
@@ -61,30 +111,25 @@ def _initialize_firebase():
         if settings.firebase_credentials_path:
             # Use service account file
             cred = credentials.Certificate(settings.firebase_credentials_path)
-            _firebase_app = firebase_admin.initialize_app(cred)
+            app = firebase_admin.initialize_app(cred)
             logger.info(
                 f"Firebase initialized with credentials from: {settings.firebase_credentials_path}"
             )
         elif settings.google_application_credentials:
             # Use GOOGLE_APPLICATION_CREDENTIALS
             cred = credentials.Certificate(settings.google_application_credentials)
-            _firebase_app = firebase_admin.initialize_app(cred)
+            app = firebase_admin.initialize_app(cred)
             logger.info("Firebase initialized with GOOGLE_APPLICATION_CREDENTIALS")
         else:
             # Use Application Default Credentials (works in GCP)
-            _firebase_app = firebase_admin.initialize_app()
+            app = firebase_admin.initialize_app()
             logger.info("Firebase initialized with Application Default Credentials")
 
-        return _firebase_app
+        return app, "ready"
 
-    except ImportError:
-        logger.warning(
-            "firebase-admin not installed. Install with: pip install firebase-admin"
-        )
-        return None
     except Exception as e:
         logger.error(f"Failed to initialize Firebase: {e}")
-        return None
+        return None, "failed"
 
 
 def get_firebase_app():
@@ -127,6 +172,9 @@ def verify_firebase_token(token: str) -> Optional[dict]:
     Returns:
         Decoded token (dict) with user info if valid, None otherwise
 
+    Successful verifications are kept in the shared token cache (see
+    app.token_cache), so repeat callers skip the signature check.
+
     The decoded token contains:
         - uid: User ID
         - email: User email (if available)
@@ -140,18 +188,51 @@ def verify_firebase_token(token: str) -> Optional[dict]:
         logger.warning("Firebase not initialized, cannot verify token")
         return None
 
-    try:
-        from firebase_admin import auth
+    key = token_cache_key(token)
+    cached = token_cache.get_claims(key)
+    if cached is not None:
+        return cached
 
+    try:
         # Verify the token
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = firebase_auth.verify_id_token(token)
+        token_cache.set_claims(key, decoded_token)
         return decoded_token
 
     except Exception as e:
-        logger.debug(f"Token verification failed: {e}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Token verification failed: %s", e)
         return None
 
 
+def prewarm_token_verifier() -> bool:
+    """
+    Fetch Google's ID token signing certificates ahead of the first request.
+
+    firebase-admin downloads the certificates lazily on the first
+    ``verify_id_token`` call and keeps them in a per-process HTTP cache, so
+    every worker would otherwise pay for that round trip on its first
+    authenticated request. Priming the verifier's own cached session at
+    startup moves the cost out of the request path.
+
+    Returns:
+        True if the certificates were fetched, False otherwise
+    """
+    app = get_firebase_app()
+    if not app:
+        return False
+
+    try:
+        from firebase_admin import _token_gen
+
+        verifier = firebase_auth._get_client(app)._token_verifier
+        response = verifier.request(url=_token_gen.ID_TOKEN_CERT_URI, method="GET")
+        return response.status == 200
+    except Exception as e:
+        logger.warning(f"Failed to prewarm Firebase token verifier: {e}")
+        return False
+
+
 # ===========================================
 # FastAPI Dependencies for Auth
 # ===========================================
@@ -176,10 +257,6 @@ async def get_current_user(
         HTTPException 401 if not authenticated
         HTTPException 403 if token is invalid
     """
-    from app.config import get_settings
-
-    settings = get_settings()
-
     # If Firebase is disabled, return anonymous user (for development)
     if not settings.firebase_enabled:
         return {
@@ -222,10 +299,6 @@ async def get_optional_user(
                 return {"data": "personalized", "user": user["uid"]}
             return {"data": "anonymous"}
     """
-    from app.config import get_settings
-
-    settings = get_settings()
-
     if not settings.firebase_enabled:
         return None
 
@@ -257,10 +330,78 @@ def require_email_verified(user: dict = Depends(get_current_user)) -> dict:
 # ===========================================
 
 
+class _UserDocumentBatcher:
+    """
+    Coalesce user document reads into a single Firestore get_all() call.
+
+    Reads requested within a short window are collected and fetched together,
+    so a burst of concurrent requests costs one RPC instead of one per user.
+    Concurrent reads of the same uid share a single result.
+    """
+
+    def __init__(self, window_seconds: float = 0.005):
+        self._window_seconds = window_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: dict[str, asyncio.Future] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def fetch(self, uid: str) -> Optional[dict]:
+        """Queue a read for uid and wait for the batched result."""
+        loop = asyncio.get_running_loop()
+
+        # Futures and the flush task belong to one loop; start over if the
+        # loop that created them is gone (tests, reloads)
+        if loop is not self._loop:
+            self._loop = loop
+            self._pending = {}
+            self._flush_task = None
+
+        future = self._pending.get(uid)
+        if future is None:
+            future = loop.create_future()
+            self._pending[uid] = future
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush())
+
+        # Shield so one cancelled caller does not cancel the shared result
+        return await asyncio.shield(future)
+
+    async def _flush(self) -> None:
+        """Wait for the batching window, then fetch all pending documents."""
+        await asyncio.sleep(self._window_seconds)
+
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+
+        documents: dict[str, dict] = {}
+        db = get_firestore_client()
+        if db:
+            try:
+                collection = db.collection("users")
+                refs = [collection.document(uid) for uid in pending]
+                # get_all is a blocking RPC; keep it off the event loop
+                snapshots = await asyncio.to_thread(lambda: list(db.get_all(refs)))
+                for snapshot in snapshots:
+                    if snapshot.exists:
+                        documents[snapshot.id] = snapshot.to_dict()
+            except Exception as e:
+                logger.error(f"Failed to get user documents: {e}")
+
+        for uid, future in pending.items():
+            if not future.done():
+                future.set_result(documents.get(uid))
+
+
+_user_document_batcher = _UserDocumentBatcher()
+
+
 async def get_user_document(uid: str) -> Optional[dict]:
     """
     Get user document from Firestore.
 
+    Concurrent calls are batched into a single Firestore read.
+
     Args:
         uid: Firebase user ID
 
@@ -271,14 +412,7 @@ async def get_user_document(uid: str) -> Optional[dict]:
     if not db:
         return None
 
-    try:
-        doc = db.collection("users").document(uid).get()
-        if doc.exists:
-            return doc.to_dict()
-        return None
-    except Exception as e:
-        logger.error(f"Failed to get user document: {e}")
-        return None
+    return await _user_document_batcher.fetch(uid)
 
 
 async def update_user_document(uid: str, data: dict) -> bool:
@@ -309,7 +443,7 @@ async def update_user_document(uid: str, data: dict) -> bool:
 # ===========================================
 
 
-@lru_cache()
+@lru_cache(maxsize=None)
 def is_firebase_available() -> bool:
     """Check if Firebase is available and configured."""
     return get_firebase_app() is not None
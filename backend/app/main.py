@@ -1,37 +1,44 @@
+import asyncio
 import logging
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 
+from app.config import settings
 from app.routers import lookup, validation, schemas
 from app.exceptions import PeppolAPIException
+from app.firebase import prewarm_token_verifier
+from app.middleware.token_hash import TokenHashMiddleware
+from app.rate_limit import limiter
+from app.secrets import preload_secrets
+from app.services.transformer import get_transformer
+from app.services.validators import HelgerValidator
+from app.responses import ORJSONResponse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Rate limiter setup
-limiter = Limiter(key_func=get_remote_address)
-
 app = FastAPI(
     title="Peppol Tools API",
     version="1.0.0",
     description="XML transformation, validation, and Peppol lookup services",
+    default_response_class=ORJSONResponse,
 )
 
-# Add rate limiter to app state
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Rate limiting (slowapi is only imported when enabled)
+if settings.enable_rate_limiting:
+    from slowapi import _rate_limit_exceeded_handler
+    from slowapi.errors import RateLimitExceeded
+
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 
 # Global exception handlers
 @app.exception_handler(PeppolAPIException)
 async def peppol_exception_handler(request: Request, exc: PeppolAPIException):
     """Handle custom Peppol API exceptions."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"error": exc.detail, "type": type(exc).__name__},
     )
@@ -41,7 +48,7 @@ async def peppol_exception_handler(request: Request, exc: PeppolAPIException):
 async def global_exception_handler(request: Request, exc: Exception):
     """Handle unhandled exceptions."""
     logger.exception(f"Unhandled exception: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"error": "Internal server error", "type": "InternalError"},
     )
@@ -49,19 +56,45 @@ async def global_exception_handler(request: Request, exc: Exception):
 # CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # tighten for prod
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=settings.cors_origins,  # tighten for prod
+    allow_methods=settings.cors_allow_methods,
+    allow_headers=settings.cors_allow_headers,
 )
 
+# Hash the bearer token once per request for caches and logging
+app.add_middleware(TokenHashMiddleware)
+
 # Routers - v1 API (versioned)
 app.include_router(lookup.router, prefix="/api/v1/lookup", tags=["lookup"])
 app.include_router(validation.router, prefix="/api/v1/validation", tags=["validation"])
 app.include_router(schemas.router, prefix="/api/v1/schemas", tags=["schemas"])
 
-# Legacy routes (backward compatibility) - will be deprecated
-app.include_router(lookup.router, prefix="/api/lookup", tags=["lookup-legacy"], include_in_schema=False)
-app.include_router(validation.router, prefix="/api/validation", tags=["validation-legacy"], include_in_schema=False)
+
+@app.on_event("startup")
+async def prewarm_firebase():
+    """Fetch Firebase signing keys before serving the first authenticated request."""
+    if settings.firebase_enabled:
+        await asyncio.to_thread(prewarm_token_verifier)
+
+
+@app.on_event("startup")
+async def prewarm_secrets():
+    """Fetch configured secrets concurrently so the first requests don't wait on Secret Manager."""
+    if settings.use_secret_manager and settings.preload_secret_names:
+        await preload_secrets(settings.preload_secret_names)
+
+
+@app.on_event("startup")
+async def precompile_mappers():
+    """Load and compile the XSLT mappers before the first transform request."""
+    count = await asyncio.to_thread(get_transformer().precompile_mappers)
+    logger.info("Precompiled %d XSLT mappers", count)
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Close pooled outbound connections."""
+    HelgerValidator.close()
 
 
 @app.get("/health")
@@ -85,10 +118,15 @@ async def root():
     }
 
 
+# Legacy routes (backward compatibility) - will be deprecated.
+# Registered last so the v1 routes match first in Starlette's linear scan.
+if settings.enable_legacy_routes:
+    app.include_router(lookup.router, prefix="/api/lookup", tags=["lookup-legacy"], include_in_schema=False)
+    app.include_router(validation.router, prefix="/api/validation", tags=["validation-legacy"], include_in_schema=False)
+
 # Global rate limits can be applied per-router or per-endpoint
 # Example usage in routers:
-# from slowapi import Limiter
-# limiter = Limiter(key_func=get_remote_address)
+# from app.rate_limit import limiter
 # @router.post("/")
 # @limiter.limit("10/minute")
 # async def my_endpoint(request: Request, ...):
@@ -1,8 +1,11 @@
 """Middleware for the Peppol Tools API."""
 
-from app.middleware.auth import get_current_user, require_role
+from app.middleware.auth import get_current_user, invalidate_token_cache, require_role
+from app.middleware.token_hash import TokenHashMiddleware
 
 __all__ = [
+    "TokenHashMiddleware",
     "get_current_user",
+    "invalidate_token_cache",
     "require_role",
 ]
@@ -3,23 +3,83 @@ Authentication Middleware.
 
 Provides FastAPI dependencies for authentication and authorization.
 """
+import asyncio
 import logging
+import time
+from collections import OrderedDict
 from typing import Callable
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from app.models.user import Role, UserInDB
 from app.services.firebase_auth import FirebaseAuthError, get_firebase_auth_service
 from app.services.user_service import get_user_service
+from app.token_cache import token_cache, token_cache_key
 
 logger = logging.getLogger(__name__)
 
+_HTTP_401 = status.HTTP_401_UNAUTHORIZED
+_HTTP_403 = status.HTTP_403_FORBIDDEN
+
 # HTTP Bearer token scheme
 security = HTTPBearer()
 
+# Minimum seconds between last-sign-in writes for the same user
+LAST_SIGN_IN_INTERVAL_SECONDS = 60
+_LAST_SIGN_IN_MAX_SIZE = 10000
+
+# uid -> time of the last write, oldest first; entries past the interval are pruned
+_last_sign_in_writes: "OrderedDict[str, float]" = OrderedDict()
+_background_tasks: set[asyncio.Task] = set()
+
+
+def invalidate_token_cache(uid: str) -> None:
+    """
+    Drop cached authentications for a user.
+
+    Call after changing a user's role or disabled flag, or deleting them, so
+    the change applies to their next request instead of after the TTL.
+    """
+    token_cache.forget_uid(uid)
+
+
+async def _safe_update_last_sign_in(user_service, uid: str) -> None:
+    """Update last sign-in timestamp, logging instead of raising on failure."""
+    try:
+        await user_service.update_last_sign_in(uid)
+    except Exception as e:
+        logger.warning("Failed to update last sign-in: %s", e)
+
+
+def _schedule_last_sign_in_update(user_service, uid: str) -> None:
+    """
+    Record the sign-in in the background, at most once per interval per user.
+
+    The Firestore write is not needed to serve the request, so it runs as a
+    separate task instead of adding a round trip to every authenticated call.
+    """
+    now = time.monotonic()
+    last_write = _last_sign_in_writes.get(uid)
+    if last_write is not None and now - last_write < LAST_SIGN_IN_INTERVAL_SECONDS:
+        return
+    _last_sign_in_writes[uid] = now
+    _last_sign_in_writes.move_to_end(uid)
+    # Entries outside the interval no longer suppress anything
+    while _last_sign_in_writes:
+        oldest_uid, oldest = next(iter(_last_sign_in_writes.items()))
+        if now - oldest < LAST_SIGN_IN_INTERVAL_SECONDS and len(_last_sign_in_writes) <= _LAST_SIGN_IN_MAX_SIZE:
+            break
+        del _last_sign_in_writes[oldest_uid]
+
+    task = asyncio.create_task(_safe_update_last_sign_in(user_service, uid))
+    # Keep a reference so the task is not garbage collected mid-flight
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> UserInDB:
     """
@@ -29,6 +89,7 @@ async def get_current_user(
     Authorization header, then retrieves the user from Firestore.
 
     Args:
+        request: Current request (for request.state.token_hash)
         credentials: HTTP Bearer credentials from Authorization header
 
     Returns:
@@ -44,6 +105,13 @@ async def get_current_user(
             return current_user
         ```
     """
+    token_hash = getattr(request.state, "token_hash", None)
+    cache_key = token_cache_key(credentials.credentials, token_hash)
+    cached_user = token_cache.get_user(cache_key)
+    if cached_user is not None:
+        _schedule_last_sign_in_update(get_user_service(), cached_user.uid)
+        return cached_user
+
     try:
         # Verify Firebase ID token
         auth_service = get_firebase_auth_service()
@@ -55,7 +123,7 @@ async def get_current_user(
 
         if not user:
             raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
+                status_code=_HTTP_401,
                 detail="User not found in database",
                 headers={"WWW-Authenticate": "Bearer"},
             )
@@ -63,22 +131,21 @@ async def get_current_user(
         # Check if account is disabled
         if user.disabled:
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
+                status_code=_HTTP_403,
                 detail="Account is disabled",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+        token_cache.set_user(cache_key, user, token_data)
+
         # Update last sign-in timestamp (non-blocking)
-        try:
-            await user_service.update_last_sign_in(user.uid)
-        except Exception as e:
-            logger.warning(f"Failed to update last sign-in: {e}")
+        _schedule_last_sign_in_update(user_service, user.uid)
 
         return user
 
     except FirebaseAuthError as e:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
+            status_code=_HTTP_401,
             detail=str(e),
             headers={"WWW-Authenticate": "Bearer"},
         )
@@ -87,7 +154,7 @@ async def get_current_user(
     except Exception as e:
         logger.error(f"Authentication error: {e}")
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
+            status_code=_HTTP_401,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
@@ -129,13 +196,14 @@ def require_role(*allowed_roles: Role) -> Callable:
         ```
     """
 
+    # Resolved once per dependency, not per request
+    allowed = frozenset(allowed_roles)
+    detail = f"Insufficient permissions. Required role: {', '.join(r.value for r in allowed_roles)}"
+
     async def role_checker(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
         """Check if user has required role."""
-        if current_user.role not in allowed_roles:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Insufficient permissions. Required role: {', '.join(r.value for r in allowed_roles)}",
-            )
+        if current_user.role not in allowed:
+            raise HTTPException(status_code=_HTTP_403, detail=detail)
         return current_user
 
     return role_checker
@@ -180,5 +248,6 @@ def optional_auth(
         return user
 
     except Exception as e:
-        logger.debug(f"Optional auth failed: {e}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Optional auth failed: %s", e)
         return None
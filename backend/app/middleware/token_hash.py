@@ -0,0 +1,33 @@
+"""
+Bearer token hashing middleware.
+
+Hashes the bearer token once per request and stores the digest on
+``request.state.token_hash`` so caches and logging can key on it without
+rehashing (or keeping the raw JWT around).
+"""
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.token_cache import hash_token
+
+
+class TokenHashMiddleware:
+    """
+    Pure ASGI middleware that sets ``request.state.token_hash``.
+
+    The digest is only an identifier for an *unverified* token: use it for
+    cache keys and log correlation, not for anything that trusts the caller.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"authorization":
+                    # Same split as fastapi.security.HTTPBearer
+                    scheme, _, token = value.partition(b" ")
+                    if token and scheme.lower() == b"bearer":
+                        scope.setdefault("state", {})["token_hash"] = hash_token(token)
+                    break
+        await self.app(scope, receive, send)
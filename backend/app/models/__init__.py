@@ -5,6 +5,7 @@ from app.models.user import (
     UserBase,
     UserCreate,
     UserInDB,
+    UserListResponse,
     UserResponse,
     UserUpdate,
 )
@@ -16,4 +17,5 @@ __all__ = [
     "UserUpdate",
     "UserInDB",
     "UserResponse",
+    "UserListResponse",
 ]
@@ -3,13 +3,41 @@ User models for authentication and user management.
 
 Pydantic models for user data validation and serialization.
 """
-import re
+import string
 from datetime import datetime
 from enum import Enum
 from typing import Optional
+from urllib.parse import urlsplit
 
 from pydantic import BaseModel, EmailStr, Field, field_validator
 
+# Photo URLs are checked with urlsplit rather than a regex: single pass, no
+# backtracking on hostile input
+_PHOTO_URL_MAX_LENGTH = 2048
+_PHOTO_URL_SCHEMES = frozenset({"http", "https"})
+
+# Password character classes, checked in C without a regex engine
+_ASCII_LETTERS = frozenset(string.ascii_letters)
+
+
+def _validate_photo_url(v: str | None) -> str | None:
+    """Validate photo URL format (shared by the user models)."""
+    if v is None:
+        return v
+    if len(v) > _PHOTO_URL_MAX_LENGTH:
+        raise ValueError("URL is too long")
+    if " " in v or not v.isprintable():
+        raise ValueError("Invalid URL format")
+    try:
+        parts = urlsplit(v)
+        hostname = parts.hostname
+        parts.port  # raises ValueError for a non-numeric or out-of-range port
+    except ValueError:
+        raise ValueError("Invalid URL format") from None
+    if parts.scheme.lower() not in _PHOTO_URL_SCHEMES or not hostname:
+        raise ValueError("Invalid URL format")
+    return v
+
 
 class Role(str, Enum):
     """User role enum."""
@@ -31,25 +59,7 @@ class UserBase(BaseModel):
     photo_url: str | None = Field(None, description="Profile photo URL")
     role: Role = Field(default=Role.USER, description="User role")
 
-    @field_validator("photo_url")
-    @classmethod
-    def validate_photo_url(cls, v: str | None) -> str | None:
-        """Validate photo URL format."""
-        if v is None:
-            return v
-        # Basic URL validation
-        url_pattern = re.compile(
-            r"^https?://"  # http:// or https://
-            r"(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|"  # domain
-            r"localhost|"  # localhost
-            r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"  # or IP
-            r"(?::\d+)?"  # optional port
-            r"(?:/?|[/?]\S+)$",
-            re.IGNORECASE,
-        )
-        if not url_pattern.match(v):
-            raise ValueError("Invalid URL format")
-        return v
+    validate_photo_url = field_validator("photo_url")(staticmethod(_validate_photo_url))
 
 
 class UserCreate(BaseModel):
@@ -79,30 +89,13 @@ class UserCreate(BaseModel):
         """
         if len(v) < 6:
             raise ValueError("Password must be at least 6 characters")
-        if not re.search(r"[a-zA-Z]", v):
+        if _ASCII_LETTERS.isdisjoint(v):
             raise ValueError("Password must contain at least one letter")
-        if not re.search(r"\d", v):
+        if not any(map(str.isdecimal, v)):
             raise ValueError("Password must contain at least one number")
         return v
 
-    @field_validator("photo_url")
-    @classmethod
-    def validate_photo_url(cls, v: str | None) -> str | None:
-        """Validate photo URL format."""
-        if v is None:
-            return v
-        url_pattern = re.compile(
-            r"^https?://"
-            r"(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|"
-            r"localhost|"
-            r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"
-            r"(?::\d+)?"
-            r"(?:/?|[/?]\S+)$",
-            re.IGNORECASE,
-        )
-        if not url_pattern.match(v):
-            raise ValueError("Invalid URL format")
-        return v
+    validate_photo_url = field_validator("photo_url")(staticmethod(_validate_photo_url))
 
 
 class UserUpdate(BaseModel):
@@ -119,24 +112,7 @@ class UserUpdate(BaseModel):
     disabled: bool | None = Field(None, description="Whether account is disabled")
     email_verified: bool | None = Field(None, description="Whether email is verified")
 
-    @field_validator("photo_url")
-    @classmethod
-    def validate_photo_url(cls, v: str | None) -> str | None:
-        """Validate photo URL format."""
-        if v is None:
-            return v
-        url_pattern = re.compile(
-            r"^https?://"
-            r"(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|"
-            r"localhost|"
-            r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"
-            r"(?::\d+)?"
-            r"(?:/?|[/?]\S+)$",
-            re.IGNORECASE,
-        )
-        if not url_pattern.match(v):
-            raise ValueError("Invalid URL format")
-        return v
+    validate_photo_url = field_validator("photo_url")(staticmethod(_validate_photo_url))
 
 
 class UserInDB(UserBase):
@@ -191,13 +167,12 @@ class UserResponse(BaseModel):
         Returns:
             UserResponse: Response model
         """
-        return cls(
-            uid=user.uid,
-            email=user.email,
-            display_name=user.display_name,
-            photo_url=user.photo_url,
-            role=user.role,
-            created_at=user.created_at,
-            email_verified=user.email_verified,
-            disabled=user.disabled,
-        )
+        # UserInDB is already validated, so copy the fields without re-running validators
+        return cls.model_construct(**{name: getattr(user, name) for name in cls.model_fields})
+
+
+class UserListResponse(BaseModel):
+    """One page of users from the list endpoint."""
+
+    users: list[UserResponse] = Field(..., description="Users on this page")
+    next_cursor: str | None = Field(None, description="Cursor for the next page, null on the last page")
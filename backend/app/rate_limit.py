@@ -0,0 +1,41 @@
+"""
+Shared rate limiter.
+
+slowapi is only imported when rate limiting is enabled in settings. With it
+disabled, routers get a no-op limiter whose ``limit()`` decorator returns the
+endpoint unchanged. Counters live in ``settings.rate_limit_storage_uri``; point
+it at Redis so limits hold across workers.
+
+Usage:
+    from app.rate_limit import limiter
+
+    @router.post("/")
+    @limiter.limit("10/minute")
+    async def my_endpoint(request: Request, ...):
+        ...
+"""
+from app.config import settings
+
+
+class _NoopLimiter:
+    """Stand-in for slowapi.Limiter when rate limiting is disabled."""
+
+    enabled = False
+
+    def limit(self, *args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+
+if settings.enable_rate_limiting:
+    from slowapi import Limiter
+    from slowapi.util import get_remote_address
+
+    limiter = Limiter(
+        key_func=get_remote_address,
+        storage_uri=settings.rate_limit_storage_uri,
+        strategy=settings.rate_limit_strategy,
+    )
+else:
+    limiter = _NoopLimiter()
@@ -0,0 +1,26 @@
+"""
+Response classes for the Peppol Tools API.
+
+FastAPI's own ORJSONResponse is deprecated in recent releases, so the orjson
+renderer lives here. It falls back to the stdlib encoder when orjson is not
+installed.
+"""
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        if not ORJSON_AVAILABLE:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -1,15 +1,14 @@
-from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
 from app.services.lookup_service import LookupService
-from app.services.codelist_service import CodeListService
+from app.services.codelist_service import CodeListService, get_codelist_service
 from app.exceptions import SchemeNotFoundError
+from app.rate_limit import limiter
+from app.responses import ORJSONResponse
 
 router = APIRouter()
-limiter = Limiter(key_func=get_remote_address)
 
 
 class LookupRequest(BaseModel):
@@ -47,11 +46,9 @@ async def lookup_participants(request: Request, req: LookupRequest):
         use_test_sml=req.use_test_sml,
         merge_pd_discovery=req.merge_pd_discovery,
     )
-    results = []
-    for raw_id in req.ids:
-        rows = svc.lookup(raw_id)
-        results.extend(rows)
-    return results
+    # Rows already have the LookupResult shape; encode them directly rather
+    # than allocating a LookupResult per row just to serialize it again
+    return ORJSONResponse(await svc.lookup_many(req.ids))
 
 
 # ==================== CODE LIST ENDPOINTS ====================
@@ -61,13 +58,12 @@ async def list_schemes(
     country: Optional[str] = Query(None, description="Filter by country code (e.g., BE, NL, DE)"),
     include_inactive: bool = Query(False, description="Include deprecated/removed schemes"),
     search: Optional[str] = Query(None, description="Search by name, ICD, or country"),
+    svc: CodeListService = Depends(get_codelist_service),
 ):
     """
     List Peppol participant identifier schemes (ICDs).
     Data is auto-synced from OpenPeppol code lists.
     """
-    svc = CodeListService()
-
     if search:
         schemes = svc.search_schemes(search)
     elif country:
@@ -93,23 +89,23 @@ async def list_schemes(
 
 
 @router.get("/schemes/status")
-async def codelist_status():
+async def codelist_status(svc: CodeListService = Depends(get_codelist_service)):
     """Get code list sync status"""
-    svc = CodeListService()
     return svc.get_status()
 
 
 @router.post("/schemes/refresh")
-async def refresh_codelists():
+async def refresh_codelists(svc: CodeListService = Depends(get_codelist_service)):
     """Force refresh code lists from OpenPeppol"""
-    svc = CodeListService()
     return svc.force_refresh()
 
 
 @router.post("/schemes/validate")
-async def validate_identifier(req: ValidateIdRequest):
+async def validate_identifier(
+    req: ValidateIdRequest,
+    svc: CodeListService = Depends(get_codelist_service),
+):
     """Validate an identifier against a scheme's rules"""
-    svc = CodeListService()
     result = svc.validate_identifier(req.icd, req.identifier)
     scheme = svc.get_scheme_by_icd(req.icd)
     return {
@@ -121,9 +117,8 @@ async def validate_identifier(req: ValidateIdRequest):
 
 
 @router.get("/schemes/{icd}")
-async def get_scheme(icd: str):
+async def get_scheme(icd: str, svc: CodeListService = Depends(get_codelist_service)):
     """Get details for a specific ICD scheme"""
-    svc = CodeListService()
     scheme = svc.get_scheme_by_icd(icd)
     if not scheme:
         raise SchemeNotFoundError(icd)
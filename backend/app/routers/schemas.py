@@ -6,28 +6,40 @@ Provides endpoints to:
 - Trigger sync from GitHub/OASIS
 - List available validation rule sets
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+import os
+from functools import lru_cache
 from typing import Optional
 
-from app.services.rules_sync import get_rules_sync_service
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+
+from app.services.rules_sync import RulesSyncService, get_rules_sync_service
 
 router = APIRouter()
 
+# Directory listings are cached per directory mtime, which changes whenever
+# an entry is added, removed or renamed, so new downloads show up right away.
+_SCHEMAS_ROOT = os.path.join(os.path.dirname(__file__), "..", "..", "..", "schemas")
+_XSD_DIR = os.path.normpath(os.path.join(_SCHEMAS_ROOT, "xsd"))
+_SCHEMATRON_DIR = os.path.normpath(os.path.join(_SCHEMAS_ROOT, "schematron"))
+_RULE_SUFFIXES = (".xslt", ".sch")
+
 
 @router.get("/status")
-async def get_schemas_status():
+async def get_schemas_status(service: RulesSyncService = Depends(get_rules_sync_service)):
     """
     Get status of all schema and rule sources.
 
     Returns counts of downloaded XSD schemas and Schematron rules,
     along with sync status for each source.
     """
-    service = get_rules_sync_service()
     return service.get_status()
 
 
 @router.post("/sync")
-async def sync_all_schemas(background_tasks: BackgroundTasks):
+async def sync_all_schemas(
+    background_tasks: BackgroundTasks,
+    service: RulesSyncService = Depends(get_rules_sync_service),
+):
     """
     Sync all schema and rule sources.
 
@@ -38,8 +50,6 @@ async def sync_all_schemas(background_tasks: BackgroundTasks):
 
     This runs in the background - check /status for progress.
     """
-    service = get_rules_sync_service()
-
     # Run sync in background
     background_tasks.add_task(service.sync_all)
 
@@ -50,7 +60,10 @@ async def sync_all_schemas(background_tasks: BackgroundTasks):
 
 
 @router.post("/sync/{source_id}")
-async def sync_source(source_id: str):
+async def sync_source(
+    source_id: str,
+    service: RulesSyncService = Depends(get_rules_sync_service),
+):
     """
     Sync a specific schema/rule source.
 
@@ -59,7 +72,6 @@ async def sync_source(source_id: str):
     - peppol-bis: Peppol BIS 3.0 Schematron rules
     - en16931-ubl: EN 16931 validation rules
     """
-    service = get_rules_sync_service()
     result = service.sync_source(source_id)
 
     if not result["success"]:
@@ -75,55 +87,77 @@ async def sync_source(source_id: str):
 @router.get("/xsd")
 async def list_xsd_schemas():
     """List available XSD schemas."""
-    from pathlib import Path
-
-    xsd_dir = Path(__file__).parent.parent.parent.parent / "schemas" / "xsd"
-    if not xsd_dir.exists():
+    try:
+        mtime_ns = os.stat(_XSD_DIR).st_mtime_ns
+    except FileNotFoundError:
         return {"schemas": [], "count": 0}
 
-    schemas = []
-    for xsd in xsd_dir.glob("*.xsd"):
-        schemas.append({
-            "name": xsd.stem,
-            "filename": xsd.name,
-        })
-
+    schemas, has_common = _scan_xsd(_XSD_DIR, mtime_ns)
     return {
         "schemas": schemas,
         "count": len(schemas),
-        "has_common": (xsd_dir / "common").exists(),
+        "has_common": has_common,
     }
 
 
 @router.get("/schematron")
 async def list_schematron_rules():
     """List available Schematron rule sets."""
-    from pathlib import Path
-
-    sch_dir = Path(__file__).parent.parent.parent.parent / "schemas" / "schematron"
-    if not sch_dir.exists():
+    if not os.path.isdir(_SCHEMATRON_DIR):
         return {"rule_sets": [], "count": 0}
 
     rule_sets = []
-
-    # List subdirectories (rule sets)
-    for subdir in sch_dir.iterdir():
-        if subdir.is_dir():
-            files = list(subdir.glob("*.xslt")) + list(subdir.glob("*.sch"))
-            rule_sets.append({
-                "name": subdir.name,
-                "files": len(files),
-                "types": {
-                    "xslt": len(list(subdir.glob("*.xslt"))),
-                    "sch": len(list(subdir.glob("*.sch"))),
-                },
-            })
-
-    # Also list files in root
-    root_files = list(sch_dir.glob("*.xslt")) + list(sch_dir.glob("*.sch"))
+    root_files = 0
+
+    with os.scandir(_SCHEMATRON_DIR) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                # List subdirectories (rule sets)
+                xslt, sch = _count_rule_files(entry.path, entry.stat().st_mtime_ns)
+                rule_sets.append({
+                    "name": entry.name,
+                    "files": xslt + sch,
+                    "types": {
+                        "xslt": xslt,
+                        "sch": sch,
+                    },
+                })
+            elif entry.name.endswith(_RULE_SUFFIXES):
+                # Also count files in root
+                root_files += 1
 
     return {
         "rule_sets": rule_sets,
-        "root_files": len(root_files),
+        "root_files": root_files,
         "total_sets": len(rule_sets),
     }
+
+
+@lru_cache(maxsize=8)
+def _scan_xsd(root: str, mtime_ns: int) -> tuple[list[dict], bool]:
+    """Return (schemas, has_common) for an XSD directory in one scandir pass."""
+    schemas = []
+    has_common = False
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.name == "common":
+                has_common = True
+            if entry.name.endswith(".xsd"):
+                schemas.append({
+                    "name": entry.name[:-4],
+                    "filename": entry.name,
+                })
+    return schemas, has_common
+
+
+@lru_cache(maxsize=64)
+def _count_rule_files(path: str, mtime_ns: int) -> tuple[int, int]:
+    """Return (xslt, sch) file counts for a rule set directory."""
+    xslt = sch = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name.endswith(".xslt"):
+                xslt += 1
+            elif entry.name.endswith(".sch"):
+                sch += 1
+    return xslt, sch
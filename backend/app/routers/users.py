@@ -3,20 +3,24 @@ User Management Router.
 
 Provides endpoints for user CRUD operations with Firebase authentication.
 """
-from typing import List
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
-from app.middleware.auth import get_current_user, require_role
+from app.middleware.auth import get_current_user, invalidate_token_cache, require_role
 from app.models.user import (
     Role,
     UserCreate,
     UserInDB,
+    UserListResponse,
     UserResponse,
     UserUpdate,
 )
 from app.services.user_service import UserNotFoundError, get_user_service
 
+# Roles allowed to manage other users
+_PRIVILEGED: frozenset[Role] = frozenset({Role.ADMIN, Role.SUPERADMIN})
+
 router = APIRouter(prefix="/api/v1/users", tags=["users"])
 
 
@@ -120,10 +124,11 @@ async def get_user(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
-@router.get("/", response_model=List[UserResponse])
+@router.get("/", response_model=UserListResponse)
 async def list_users(
     limit: int = 100,
-    offset: int = 0,
+    cursor: Optional[str] = None,
+    offset: int = Query(0, deprecated=True),
     current_user: UserInDB = Depends(require_role(Role.ADMIN, Role.SUPERADMIN)),
 ):
     """
@@ -133,35 +138,38 @@ async def list_users(
 
     **Query Parameters:**
     - `limit`: Maximum number of users to return (default: 100, max: 1000)
-    - `offset`: Number of users to skip (default: 0)
+    - `cursor`: Value of `next_cursor` from the previous page
+    - `offset`: Deprecated, use `cursor`. Number of users to skip (default: 0)
 
     **Response:**
     ```json
-    [
-        {
-            "uid": "user1_uid",
-            "email": "user1@example.com",
-            "display_name": "User One",
-            "role": "user",
-            "created_at": "2025-12-03T10:00:00Z",
-            "email_verified": true,
-            "disabled": false
-        },
-        {
-            "uid": "user2_uid",
-            "email": "user2@example.com",
-            "display_name": "User Two",
-            "role": "admin",
-            "created_at": "2025-12-02T09:00:00Z",
-            "email_verified": true,
-            "disabled": false
-        }
-    ]
+    {
+        "users": [
+            {
+                "uid": "user1_uid",
+                "email": "user1@example.com",
+                "display_name": "User One",
+                "role": "user",
+                "created_at": "2025-12-03T10:00:00Z",
+                "email_verified": true,
+                "disabled": false
+            }
+        ],
+        "next_cursor": "dXNlcjFfdWlkfDIwMjUtMTItMDNUMTA6MDA6MDA="
+    }
     ```
     """
     user_service = get_user_service()
-    users = await user_service.list_users(limit=limit, offset=offset)
-    return [UserResponse.from_user_in_db(user) for user in users]
+    users, next_cursor = await user_service.list_users_page(limit=limit, cursor=cursor, offset=offset)
+
+    page = UserListResponse.model_construct(
+        users=[UserResponse.from_user_in_db(user) for user in users],
+        next_cursor=next_cursor,
+    )
+    return Response(
+        content=page.model_dump_json(),
+        media_type="application/json",
+    )
 
 
 @router.patch("/{uid}", response_model=UserResponse)
@@ -203,14 +211,14 @@ async def update_user(
     ```
     """
     # Check permissions: users can only update themselves, admins can update anyone
-    if current_user.uid != uid and current_user.role not in [Role.ADMIN, Role.SUPERADMIN]:
+    if current_user.uid != uid and current_user.role not in _PRIVILEGED:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Insufficient permissions to update this user",
         )
 
     # Only admins can change role
-    if user_data.role is not None and current_user.role not in [Role.ADMIN, Role.SUPERADMIN]:
+    if user_data.role is not None and current_user.role not in _PRIVILEGED:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can change user roles",
@@ -219,6 +227,7 @@ async def update_user(
     user_service = get_user_service()
     try:
         user = await user_service.update_user(uid, user_data)
+        invalidate_token_cache(uid)
         return UserResponse.from_user_in_db(user)
     except UserNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -244,5 +253,6 @@ async def delete_user(
     user_service = get_user_service()
     try:
         await user_service.delete_user(uid)
+        invalidate_token_cache(uid)
     except UserNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
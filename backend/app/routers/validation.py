@@ -2,25 +2,75 @@ from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Req
 from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
 import base64
 import zipfile
 import io
+import json
+import os
+import secrets
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import Any, BinaryIO, Callable, Iterator, Literal
 
 import lxml.etree as ET
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
 from app.services.validators import ValidatorRegistry, HelgerValidator, XSDValidator
-from app.services.transformer import get_transformer, TransformerService
+from app.services.transformer import get_transformer, TransformerService, XMLSource
 from app.exceptions import MapperNotFoundError, TransformationError, XMLParseError
+from app.rate_limit import limiter
+from app.responses import ORJSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+# Optional SIMD base64 encoder; the stdlib is used when it is not installed
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+    pybase64 = None
 
 router = APIRouter()
-limiter = Limiter(key_func=get_remote_address)
 
 # Shared instances
 _registry = ValidatorRegistry()
 
+# XSLT is CPU-bound and lxml releases the GIL while applying a stylesheet,
+# so a batch of files transforms in parallel on this pool
+_xslt_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="xslt")
+
+# Files validated at once across all requests (bounds concurrent calls to Helger)
+VALIDATION_CONCURRENCY = 8
+_validation_semaphore: Optional[asyncio.Semaphore] = None
+_validation_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Common VESIDs for Helger validation
+VESIDS = [
+    {"id": "eu.peppol.bis3:invoice:2025.5", "name": "Peppol BIS3 Invoice", "format": "ubl"},
+    {"id": "eu.peppol.bis3:creditnote:2025.5", "name": "Peppol BIS3 Credit Note", "format": "ubl"},
+    {"id": "eu.cen.en16931:ubl:1.3.15", "name": "EN 16931 UBL Invoice", "format": "ubl"},
+    {"id": "eu.cen.en16931:ubl-creditnote:1.3.15", "name": "EN 16931 UBL Credit Note", "format": "ubl"},
+    {"id": "eu.cen.en16931:cii:1.3.15", "name": "EN 16931 CII", "format": "cii"},
+    {"id": "de.zugferd:en16931:2.3.3", "name": "ZUGFeRD 2.3.3 EN16931", "format": "cii"},
+    {"id": "de.zugferd:extended:2.3.3", "name": "ZUGFeRD 2.3.3 Extended", "format": "cii"},
+    {"id": "de.zugferd:basic:2.3.3", "name": "ZUGFeRD 2.3.3 Basic", "format": "cii"},
+    {"id": "fr.factur-x:en16931:1.0.7-3", "name": "Factur-X EN16931", "format": "cii"},
+    {"id": "de.xrechnung:ubl-invoice:3.0.2", "name": "XRechnung 3.0.2 Invoice", "format": "ubl"},
+]
+
+# Static payloads, serialized once at import
+_VESIDS_JSON = ORJSONResponse({"vesids": VESIDS}).body
+_VALIDATORS_JSON = ORJSONResponse({"validators": _registry.list_validators()}).body
+_SUPPORTED_XSLT_VERSIONS = ["1.0", "2.0", "3.0"] if TransformerService.is_saxon_available() else ["1.0"]
+
 
 # ==================== SCHEMAS ====================
 
@@ -37,7 +87,181 @@ class MapperUploadResponse(BaseModel):
 
 # ==================== HELPER FUNCTIONS ====================
 
-def transform_xml(xml_bytes: bytes, mapper_name: str) -> bytes:
+# Uploads larger than this spill from memory to a temp file
+_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """
+    Write-only sink for zipfile that hands back what was written so far.
+
+    It is not seekable, so zipfile writes entries with data descriptors and
+    each finished entry can be streamed as soon as it is written.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _spool_upload(file: UploadFile) -> BinaryIO:
+    """Copy an upload into a spooled temp file, reading it in chunks."""
+    spool = SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE)
+    while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def _stream_transformed_zip(
+    spool: BinaryIO,
+    zf: zipfile.ZipFile,
+    xslt_bytes: bytes,
+    xml_files: list[str],
+) -> Iterator[bytes]:
+    """
+    Transform each XML in the archive and yield the output ZIP incrementally.
+
+    Runs in Starlette's threadpool (it is a sync iterator), so the transforms
+    do not block the event loop. The response status is already sent, so an
+    entry that cannot be read is recorded as failed in _results.json rather
+    than aborting the archive. Closes the input archive when done.
+    """
+    transformer = get_transformer()
+    buffer = _ZipStreamBuffer()
+    try:
+        results = []
+
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as out_zf:
+            for xml_name in xml_files:
+                try:
+                    with zf.open(xml_name) as xml_stream:
+                        result = transformer.transform(xml_stream, xslt_bytes)
+                except (zipfile.BadZipFile, zlib.error, EOFError, OSError) as e:
+                    results.append({
+                        "input": xml_name,
+                        "output": None,
+                        "success": False,
+                        "error": f"Could not read entry: {e}",
+                    })
+                    continue
+
+                if result.success:
+                    # xml_files all end in ".xml"; keep any folder prefix
+                    out_filename = f"{xml_name[:-4]}_transformed.xml"
+                    out_zf.writestr(out_filename, result.output)
+                    results.append({
+                        "input": xml_name,
+                        "output": out_filename,
+                        "success": True,
+                        "xslt_version": result.xslt_version.value,
+                    })
+                else:
+                    results.append({
+                        "input": xml_name,
+                        "output": None,
+                        "success": False,
+                        "error": result.error,
+                    })
+
+                chunk = buffer.drain()
+                if chunk:
+                    yield chunk
+
+            # Add results manifest
+            if ORJSON_AVAILABLE:
+                manifest = orjson.dumps(results, option=orjson.OPT_INDENT_2)
+            else:
+                manifest = json.dumps(results, indent=2).encode()
+            out_zf.writestr("_results.json", manifest)
+
+        yield buffer.drain()
+    finally:
+        zf.close()
+        spool.close()
+
+
+def _get_validation_semaphore() -> asyncio.Semaphore:
+    """Shared validation semaphore, created in (and for) the running event loop."""
+    global _validation_semaphore, _validation_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _validation_semaphore is None or _validation_semaphore_loop is not loop:
+        _validation_semaphore = asyncio.Semaphore(VALIDATION_CONCURRENCY)
+        _validation_semaphore_loop = loop
+    return _validation_semaphore
+
+
+async def _run_in_xslt_pool(func: Callable[..., Any], *args) -> Any:
+    """Run a blocking transform on the XSLT thread pool."""
+    return await asyncio.get_running_loop().run_in_executor(_xslt_pool, func, *args)
+
+
+def _b64encode(data: bytes) -> str:
+    """Base64-encode bytes to str, using pybase64 when available."""
+    if PYBASE64_AVAILABLE:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode("ascii")
+
+
+def _transform_result_entry(filename: Optional[str], result) -> dict:
+    """Build the per-file entry returned by the transform endpoints."""
+    return {
+        "filename": filename,
+        "success": result.success,
+        "transformed_xml": _b64encode(result.output) if result.success else None,
+        "xslt_version": result.xslt_version.value if result.xslt_version else None,
+        "processor": result.processor,
+        "error": None if result.success else result.error,
+    }
+
+
+def _multipart_results(results: list[tuple[Optional[str], Any]]) -> StreamingResponse:
+    """
+    Return transform results as multipart/mixed with one raw part per file.
+
+    Successful files are sent as application/xml parts, failures as
+    application/json parts holding the usual result entry. This avoids the
+    base64 encoding (and 33% size overhead) of the JSON response.
+    """
+    boundary = secrets.token_hex(16)
+    delimiter = f"--{boundary}\r\n".encode()
+
+    def parts() -> Iterator[bytes]:
+        for filename, result in results:
+            name = (filename or "document.xml").replace('"', "")
+            if result.success:
+                body = result.output
+                content_type = "application/xml"
+                name = f"{Path(name).stem}_transformed.xml"
+            else:
+                body = json.dumps(_transform_result_entry(filename, result)).encode()
+                content_type = "application/json"
+            yield delimiter
+            yield (
+                f"Content-Type: {content_type}\r\n"
+                f'Content-Disposition: attachment; filename="{name}"\r\n\r\n'
+            ).encode()
+            yield body
+            yield b"\r\n"
+        yield f"--{boundary}--\r\n".encode()
+
+    return StreamingResponse(parts(), media_type=f"multipart/mixed; boundary={boundary}")
+
+
+def transform_xml(xml_bytes: XMLSource, mapper_name: str) -> bytes:
     """Apply XSLT transformation using the transformer service."""
     transformer = get_transformer()
     result = transformer.transform_with_mapper(xml_bytes, mapper_name)
@@ -53,9 +277,7 @@ def transform_xml(xml_bytes: bytes, mapper_name: str) -> bytes:
 @router.get("/validators")
 async def list_validators():
     """List all available validators"""
-    return {
-        "validators": _registry.list_validators(),
-    }
+    return Response(content=_VALIDATORS_JSON, media_type="application/json")
 
 
 @router.get("/mappers")
@@ -69,7 +291,7 @@ async def list_mappers():
     return {
         "mappers": mappers,
         "saxon_available": TransformerService.is_saxon_available(),
-        "supported_versions": ["1.0"] if not TransformerService.is_saxon_available() else ["1.0", "2.0", "3.0"],
+        "supported_versions": _SUPPORTED_XSLT_VERSIONS,
     }
 
 
@@ -122,55 +344,32 @@ async def delete_mapper(mapper_name: str):
 @router.get("/vesids")
 async def list_vesids():
     """List common VESIDs for Helger validation"""
-    return {
-        "vesids": [
-            {"id": "eu.peppol.bis3:invoice:2025.5", "name": "Peppol BIS3 Invoice", "format": "ubl"},
-            {"id": "eu.peppol.bis3:creditnote:2025.5", "name": "Peppol BIS3 Credit Note", "format": "ubl"},
-            {"id": "eu.cen.en16931:ubl:1.3.15", "name": "EN 16931 UBL Invoice", "format": "ubl"},
-            {"id": "eu.cen.en16931:ubl-creditnote:1.3.15", "name": "EN 16931 UBL Credit Note", "format": "ubl"},
-            {"id": "eu.cen.en16931:cii:1.3.15", "name": "EN 16931 CII", "format": "cii"},
-            {"id": "de.zugferd:en16931:2.3.3", "name": "ZUGFeRD 2.3.3 EN16931", "format": "cii"},
-            {"id": "de.zugferd:extended:2.3.3", "name": "ZUGFeRD 2.3.3 Extended", "format": "cii"},
-            {"id": "de.zugferd:basic:2.3.3", "name": "ZUGFeRD 2.3.3 Basic", "format": "cii"},
-            {"id": "fr.factur-x:en16931:1.0.7-3", "name": "Factur-X EN16931", "format": "cii"},
-            {"id": "de.xrechnung:ubl-invoice:3.0.2", "name": "XRechnung 3.0.2 Invoice", "format": "ubl"},
-        ]
-    }
+    return Response(content=_VESIDS_JSON, media_type="application/json")
 
 
 @router.post("/transform")
 async def transform_files(
     files: list[UploadFile] = File(...),
     mapper: str = Form(...),
+    response_format: Literal["json", "multipart"] = Query("json"),
 ):
-    """Transform XML files using specified XSL mapper (XSLT 1.0/2.0/3.0)"""
-    transformer = get_transformer()
-    results = []
+    """
+    Transform XML files using specified XSL mapper (XSLT 1.0/2.0/3.0)
 
-    for file in files:
-        content = await file.read()
-        result = transformer.transform_with_mapper(content, mapper)
+    With response_format=multipart the transformed XML is returned raw as
+    multipart/mixed parts instead of base64 inside JSON.
+    """
+    transformer = get_transformer()
 
-        if result.success:
-            results.append({
-                "filename": file.filename,
-                "success": True,
-                "transformed_xml": base64.b64encode(result.output).decode("utf-8"),
-                "xslt_version": result.xslt_version.value if result.xslt_version else None,
-                "processor": result.processor,
-                "error": None,
-            })
-        else:
-            results.append({
-                "filename": file.filename,
-                "success": False,
-                "transformed_xml": None,
-                "xslt_version": result.xslt_version.value if result.xslt_version else None,
-                "processor": result.processor,
-                "error": result.error,
-            })
+    async def transform_one(file: UploadFile):
+        # Parse from the spooled upload on the worker thread, not a copy read on the loop
+        result = await _run_in_xslt_pool(transformer.transform_with_mapper, file.file, mapper)
+        return file.filename, result
 
-    return {"results": results}
+    results = await asyncio.gather(*(transform_one(f) for f in files))
+    if response_format == "multipart":
+        return _multipart_results(results)
+    return {"results": [_transform_result_entry(name, result) for name, result in results]}
 
 
 @router.post("/transform/download")
@@ -182,13 +381,11 @@ async def transform_and_download(
     Transform a single XML file and return as downloadable file.
     Supports XSLT 1.0, 2.0, and 3.0.
     """
-    content = await file.read()
-    transformed = transform_xml(content, mapper)
+    transformed = await _run_in_xslt_pool(transform_xml, file.file, mapper)
 
     # Generate output filename
     original_name = file.filename or "document.xml"
-    base_name = original_name.rsplit(".", 1)[0]
-    output_filename = f"{base_name}_transformed.xml"
+    output_filename = f"{Path(original_name).stem}_transformed.xml"
 
     return Response(
         content=transformed,
@@ -211,115 +408,84 @@ async def transform_zip(
     - *.xml - XML files to transform
     - mapper.txt (optional) - Name of the mapper to use
 
-    Returns a ZIP with transformed XMLs.
+    Returns a ZIP with transformed XMLs, streamed as each file is transformed.
     """
-    transformer = get_transformer()
-    content = await file.read()
+    spool = await _spool_upload(file)
 
     try:
-        with zipfile.ZipFile(io.BytesIO(content), 'r') as zf:
-            # Find files by extension
-            xslt_files = [n for n in zf.namelist() if n.lower().endswith(('.xsl', '.xslt'))]
-            xml_files = [n for n in zf.namelist() if n.lower().endswith('.xml')]
-
-            if not xslt_files:
-                raise HTTPException(status_code=400, detail="No XSLT file found in ZIP")
-            if not xml_files:
-                raise HTTPException(status_code=400, detail="No XML files found in ZIP")
-
-            # Check for mapper.txt to specify which XSLT to use
-            mapper_name = xslt_files[0]
-            if 'mapper.txt' in zf.namelist():
-                specified = zf.read('mapper.txt').decode('utf-8').strip()
-                if specified in xslt_files:
-                    mapper_name = specified
-
-            # Read XSLT
-            xslt_bytes = zf.read(mapper_name)
-
-            # Process each XML
-            results = []
-            output_zip = io.BytesIO()
-
-            with zipfile.ZipFile(output_zip, 'w', zipfile.ZIP_DEFLATED) as out_zf:
-                for xml_name in xml_files:
-                    xml_bytes = zf.read(xml_name)
-                    result = transformer.transform(xml_bytes, xslt_bytes)
-
-                    base_name = xml_name.rsplit('.', 1)[0]
-                    if result.success:
-                        out_filename = f"{base_name}_transformed.xml"
-                        out_zf.writestr(out_filename, result.output)
-                        results.append({
-                            "input": xml_name,
-                            "output": out_filename,
-                            "success": True,
-                            "xslt_version": result.xslt_version.value,
-                        })
-                    else:
-                        results.append({
-                            "input": xml_name,
-                            "output": None,
-                            "success": False,
-                            "error": result.error,
-                        })
-
-                # Add results manifest
-                import json
-                out_zf.writestr("_results.json", json.dumps(results, indent=2))
-
-            output_zip.seek(0)
-
-            return StreamingResponse(
-                output_zip,
-                media_type="application/zip",
-                headers={
-                    "Content-Disposition": 'attachment; filename="transformed.zip"'
-                }
-            )
-
+        zf = zipfile.ZipFile(spool, 'r')
     except zipfile.BadZipFile:
+        spool.close()
         raise HTTPException(status_code=400, detail="Invalid ZIP file")
 
+    try:
+        # Find files by extension
+        # Classify entries in one pass; namelist() builds a new list per call
+        names = zf.namelist()
+        xslt_files = []
+        xml_files = []
+        for n in names:
+            lower = n.lower()
+            if lower.endswith(('.xsl', '.xslt')):
+                xslt_files.append(n)
+            elif lower.endswith('.xml'):
+                xml_files.append(n)
+
+        if not xslt_files:
+            raise HTTPException(status_code=400, detail="No XSLT file found in ZIP")
+        if not xml_files:
+            raise HTTPException(status_code=400, detail="No XML files found in ZIP")
+
+        # Check for mapper.txt to specify which XSLT to use
+        mapper_name = xslt_files[0]
+        if 'mapper.txt' in names:
+            specified = zf.read('mapper.txt').decode('utf-8').strip()
+            if specified in xslt_files:
+                mapper_name = specified
+
+        # Read the mapper before streaming so a damaged one still gets a 400
+        try:
+            xslt_bytes = zf.read(mapper_name)
+        except (zipfile.BadZipFile, zlib.error, EOFError):
+            raise HTTPException(status_code=400, detail="Invalid ZIP file")
+    except BaseException:
+        zf.close()
+        spool.close()
+        raise
+
+    return StreamingResponse(
+        _stream_transformed_zip(spool, zf, xslt_bytes, xml_files),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": 'attachment; filename="transformed.zip"'
+        }
+    )
+
 
 @router.post("/transform/inline")
 async def transform_inline(
     files: list[UploadFile] = File(...),
     xslt: UploadFile = File(...),
+    response_format: Literal["json", "multipart"] = Query("json"),
 ):
     """
     Transform XML files using an uploaded XSLT (not saved).
 
     Use this for one-off transformations where you don't want to save the mapper.
+    With response_format=multipart the transformed XML is returned raw as
+    multipart/mixed parts instead of base64 inside JSON.
     """
     transformer = get_transformer()
     xslt_bytes = await xslt.read()
 
-    results = []
-    for file in files:
-        content = await file.read()
-        result = transformer.transform(content, xslt_bytes)
+    async def transform_one(file: UploadFile):
+        result = await _run_in_xslt_pool(transformer.transform, file.file, xslt_bytes)
+        return file.filename, result
 
-        if result.success:
-            results.append({
-                "filename": file.filename,
-                "success": True,
-                "transformed_xml": base64.b64encode(result.output).decode("utf-8"),
-                "xslt_version": result.xslt_version.value if result.xslt_version else None,
-                "processor": result.processor,
-                "error": None,
-            })
-        else:
-            results.append({
-                "filename": file.filename,
-                "success": False,
-                "transformed_xml": None,
-                "xslt_version": result.xslt_version.value if result.xslt_version else None,
-                "processor": result.processor,
-                "error": result.error,
-            })
-
-    return {"results": results}
+    results = await asyncio.gather(*(transform_one(f) for f in files))
+    if response_format == "multipart":
+        return _multipart_results(results)
+    return {"results": [_transform_result_entry(name, result) for name, result in results]}
 
 
 @router.post("/validate")
@@ -340,35 +506,36 @@ async def validate_files(
     """
     validator_types = [v.strip() for v in validators.split(",") if v.strip()]
 
-    results = []
-    for file in files:
+    async def validate_one(file: UploadFile) -> dict:
         content = await file.read()
 
         try:
             # Transform if mapper specified
             if mapper:
-                content = transform_xml(content, mapper)
+                content = await _run_in_xslt_pool(transform_xml, content, mapper)
 
             # Run validation
-            multi_result = await _registry.validate(
-                content,
-                validator_types=validator_types,
-                vesid=vesid,
-            )
-
-            results.append({
+            async with _get_validation_semaphore():
+                multi_result = await _registry.validate(
+                    content,
+                    validator_types=validator_types,
+                    vesid=vesid,
+                )
+
+            return {
                 "filename": file.filename,
                 **multi_result.to_dict(),
                 "transformed": mapper is not None,
-                "transformed_xml": base64.b64encode(content).decode("utf-8") if mapper else None,
-            })
+                "transformed_xml": _b64encode(content) if mapper else None,
+            }
         except Exception as e:
-            results.append({
+            return {
                 "filename": file.filename,
                 "overall_success": False,
                 "error": str(e),
-            })
+            }
 
+    results = await asyncio.gather(*(validate_one(f) for f in files))
     return {"results": results}
 
 
@@ -387,30 +554,31 @@ async def validate_and_compare(
     """
     validator_types = [v.strip() for v in validators.split(",") if v.strip()]
 
-    results = []
-    for file in files:
+    async def compare_one(file: UploadFile) -> dict:
         content = await file.read()
 
         try:
             if mapper:
-                content = transform_xml(content, mapper)
+                content = await _run_in_xslt_pool(transform_xml, content, mapper)
 
-            comparison = await _registry.validate_with_comparison(
-                content,
-                validator_types=validator_types,
-                vesid=vesid,
-            )
+            async with _get_validation_semaphore():
+                comparison = await _registry.validate_with_comparison(
+                    content,
+                    validator_types=validator_types,
+                    vesid=vesid,
+                )
 
-            results.append({
+            return {
                 "filename": file.filename,
                 **comparison,
-            })
+            }
         except Exception as e:
-            results.append({
+            return {
                 "filename": file.filename,
                 "error": str(e),
-            })
+            }
 
+    results = await asyncio.gather(*(compare_one(f) for f in files))
     return {"results": results}
 
 
@@ -423,24 +591,24 @@ async def validate_quick(
     Quick validation using only local validators (XSD, Schematron).
     No rate limits, no external API calls.
     """
-    results = []
-    for file in files:
+    async def validate_one(file: UploadFile) -> dict:
         content = await file.read()
 
         try:
             if mapper:
-                content = transform_xml(content, mapper)
+                content = await _run_in_xslt_pool(transform_xml, content, mapper)
 
             multi_result = await _registry.validate_local_only(content)
 
-            results.append({
+            return {
                 "filename": file.filename,
                 **multi_result.to_dict(),
-            })
+            }
         except Exception as e:
-            results.append({
+            return {
                 "filename": file.filename,
                 "error": str(e),
-            })
+            }
 
+    results = await asyncio.gather(*(validate_one(f) for f in files))
     return {"results": results}
@@ -10,10 +10,16 @@ Usage:
     # Force env var only (skip Secret Manager)
     api_key = get_secret("API_KEY", use_secret_manager=False)
 """
+import asyncio
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from functools import lru_cache
-from typing import Optional
+from typing import Iterable, Optional
+
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +50,12 @@ def _get_secret_manager_client():
     return _secret_manager_client
 
 
+@lru_cache(maxsize=1)
+def _default_project_id() -> Optional[str]:
+    """Project ID from settings, falling back to GOOGLE_CLOUD_PROJECT."""
+    return settings.gcp_project_id or os.environ.get("GOOGLE_CLOUD_PROJECT")
+
+
 def get_secret(
     secret_name: str,
     project_id: Optional[str] = None,
@@ -79,17 +91,13 @@ def get_secret(
         # Specific project and version
         api_key = get_secret("API_KEY", project_id="my-project", version="2")
     """
-    from app.config import get_settings
-
-    settings = get_settings()
-
     # Determine if we should use Secret Manager
     if use_secret_manager is None:
         use_secret_manager = settings.use_secret_manager
 
     # Resolve project ID
     if project_id is None:
-        project_id = settings.gcp_project_id or os.environ.get("GOOGLE_CLOUD_PROJECT")
+        project_id = _default_project_id()
 
     # Try Secret Manager first (if enabled and configured)
     if use_secret_manager and project_id:
@@ -127,7 +135,31 @@ def get_secret(
     return None
 
 
-@lru_cache(maxsize=100)
+# Cached secret values, least recently used first. Entries expire so rotated
+# secrets (new versions under "latest") are picked up without a restart.
+SECRET_CACHE_TTL_SECONDS = settings.secret_cache_ttl_minutes * 60
+_SECRET_CACHE_MAX_SIZE = 100
+_secret_cache: "OrderedDict[tuple, tuple[float, Optional[str]]]" = OrderedDict()
+_secret_cache_lock = threading.Lock()
+# One lock per key being fetched, so concurrent misses share a single lookup
+_inflight: dict[tuple, threading.Lock] = {}
+_MISSING = object()
+
+
+def _get_cached_secret(key: tuple):
+    """Return the cached value for key, or _MISSING if absent or expired."""
+    with _secret_cache_lock:
+        entry = _secret_cache.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del _secret_cache[key]
+            return _MISSING
+        _secret_cache.move_to_end(key)
+        return value
+
+
 def get_secret_cached(
     secret_name: str,
     project_id: Optional[str] = None,
@@ -136,10 +168,63 @@ def get_secret_cached(
     """
     Cached version of get_secret for frequently accessed secrets.
 
-    Note: Cache does not expire automatically. Clear with:
-        get_secret_cached.cache_clear()
+    Values are kept for SECRET_CACHE_TTL_SECONDS. Concurrent misses for the
+    same secret wait for one Secret Manager call instead of each making one.
+    Clear with clear_secret_cache().
     """
-    return get_secret(secret_name, project_id, version)
+    key = (secret_name, project_id, version)
+    value = _get_cached_secret(key)
+    if value is not _MISSING:
+        return value
+
+    with _secret_cache_lock:
+        key_lock = _inflight.setdefault(key, threading.Lock())
+
+    with key_lock:
+        # Another thread may have fetched it while we waited
+        value = _get_cached_secret(key)
+        if value is not _MISSING:
+            return value
+
+        try:
+            value = get_secret(secret_name, project_id, version)
+            with _secret_cache_lock:
+                _secret_cache[key] = (time.monotonic() + SECRET_CACHE_TTL_SECONDS, value)
+                _secret_cache.move_to_end(key)
+                if len(_secret_cache) > _SECRET_CACHE_MAX_SIZE:
+                    _secret_cache.popitem(last=False)
+        finally:
+            with _secret_cache_lock:
+                _inflight.pop(key, None)
+
+    return value
+
+
+def clear_secret_cache() -> None:
+    """Drop all cached secret values."""
+    with _secret_cache_lock:
+        _secret_cache.clear()
+
+
+async def preload_secrets(names: Iterable[str], project_id: Optional[str] = None) -> None:
+    """
+    Warm the secret cache by fetching several secrets concurrently.
+
+    The Secret Manager client is synchronous, so each fetch runs in a worker
+    thread; N secrets then cost about one round trip at startup instead of N.
+
+    Args:
+        names: Secret names to fetch
+        project_id: GCP project ID (defaults to config or GOOGLE_CLOUD_PROJECT)
+    """
+    names = list(names)
+    if not names:
+        return
+
+    await asyncio.gather(
+        *(asyncio.to_thread(get_secret_cached, name, project_id) for name in names)
+    )
+    logger.info("Preloaded %d secrets", len(names))
 
 
 def list_secrets(project_id: Optional[str] = None) -> list[str]:
@@ -152,12 +237,8 @@ def list_secrets(project_id: Optional[str] = None) -> list[str]:
     Returns:
         List of secret names
     """
-    from app.config import get_settings
-
-    settings = get_settings()
-
     if project_id is None:
-        project_id = settings.gcp_project_id or os.environ.get("GOOGLE_CLOUD_PROJECT")
+        project_id = _default_project_id()
 
     if not project_id:
         logger.warning("No project ID configured for Secret Manager")
@@ -199,12 +280,8 @@ def create_secret(
     Returns:
         True if successful, False otherwise
     """
-    from app.config import get_settings
-
-    settings = get_settings()
-
     if project_id is None:
-        project_id = settings.gcp_project_id or os.environ.get("GOOGLE_CLOUD_PROJECT")
+        project_id = _default_project_id()
 
     if not project_id:
         logger.error("No project ID configured for Secret Manager")
@@ -5,16 +5,93 @@ Fetches participant identifier schemes (ICDs) from official source.
 import json
 import re
 import time
+from collections import defaultdict
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from ..config import settings
 
+# orjson is optional; it parses and writes the cache files faster than json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+# zstandard is optional; with it the schemes cache is stored compressed
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
 CODELISTS_BASE = "https://docs.peppol.eu/edelivery/codelists"
 CACHE_DIR = settings.codelists_dir
 CACHE_TTL_HOURS = 24  # Refresh once per day
+# How often a running service checks whether another worker rewrote the cache
+CACHE_CHECK_INTERVAL_SECONDS = 60
+
+# Identifier pattern inside a scheme's "validation-rules" text
+_RULES_RE = re.compile(r'RegEx:\s*([^\n]+)')
+
+
+# One HTTP session for code list fetches, so the index page and the JSON
+# download share a keep-alive connection; transient 5xx responses are retried
+_session: Optional[requests.Session] = None
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+        _session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=retry))
+    return _session
+
+
+def _load_json(path) -> object:
+    """Parse a JSON cache file (zstd-compressed if it ends in .zst)"""
+    data = path.read_bytes()
+    if path.suffix == ".zst":
+        data = zstandard.ZstdDecompressor().decompress(data)
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dump_json(path, obj, indent: bool = False) -> None:
+    """Write a JSON cache file (zstd-compressed if it ends in .zst)"""
+    if ORJSON_AVAILABLE:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    elif indent:
+        data = json.dumps(obj, indent=2).encode()
+    else:
+        data = json.dumps(obj, separators=(",", ":")).encode()
+    if path.suffix == ".zst":
+        data = zstandard.ZstdCompressor(level=3).compress(data)
+    path.write_bytes(data)
+
+
+def _schemes_cache_file():
+    """Path of the schemes cache, migrating an uncompressed one to zstd when possible"""
+    legacy_file = CACHE_DIR / "participant_schemes.json"
+    if not ZSTD_AVAILABLE:
+        return legacy_file
+    cache_file = CACHE_DIR / "participant_schemes.json.zst"
+    if not cache_file.exists() and legacy_file.exists():
+        try:
+            _dump_json(cache_file, _load_json(legacy_file))
+            legacy_file.unlink()
+        except Exception:
+            return legacy_file
+    return cache_file
 
 
 class CodeListService:
@@ -22,6 +99,15 @@ class CodeListService:
     _schemes: list[dict] = []
     _last_fetch: Optional[datetime] = None
     _version: str = ""
+    # mtime of the cache file _schemes was last read from or written to
+    _cache_mtime: float = 0.0
+    # ICD -> (pattern, compiled pattern or the re.error it raised)
+    _compiled_patterns: dict[str, tuple[str, "re.Pattern | re.error"]] = {}
+    # Lookup indexes, rebuilt by _invalidate() whenever _schemes changes
+    _active_schemes: list[dict] = []
+    _by_icd: dict[str, dict] = {}
+    _by_country: dict[str, list[dict]] = {}
+    _search_index: list[tuple[str, dict]] = []
 
     def __new__(cls):
         if cls._instance is None:
@@ -35,30 +121,96 @@ class CodeListService:
     def _load_or_fetch(self):
         """Load from cache or fetch fresh"""
         CACHE_DIR.mkdir(parents=True, exist_ok=True)
-        cache_file = CACHE_DIR / "participant_schemes.json"
+        if not self._load_cache():
+            self._fetch_and_cache()
+
+    def _load_cache(self) -> bool:
+        """
+        Load schemes from the cache file if it is still within the TTL.
+
+        Returns False if the cache is missing, stale or unreadable. Parsing is
+        skipped when the file has not changed since it was last read.
+        """
+        cache_file = _schemes_cache_file()
         meta_file = CACHE_DIR / "meta.json"
 
         # Check cache validity
         if cache_file.exists() and meta_file.exists():
             try:
-                meta = json.loads(meta_file.read_text(encoding="utf-8"))
+                meta = _load_json(meta_file)
                 last_fetch = datetime.fromisoformat(meta.get("last_fetch", "2000-01-01"))
                 if datetime.now() - last_fetch < timedelta(hours=CACHE_TTL_HOURS):
-                    self._schemes = json.loads(cache_file.read_text(encoding="utf-8"))
                     self._version = meta.get("version", "")
                     self._last_fetch = last_fetch
-                    return
+                    # Skip the parse when the file hasn't changed since we read it
+                    mtime = cache_file.stat().st_mtime
+                    if self._schemes and mtime == CodeListService._cache_mtime:
+                        return True
+                    self._schemes = _load_json(cache_file)
+                    CodeListService._cache_mtime = mtime
+                    self._invalidate()
+                    return True
             except Exception:
                 pass
+        return False
 
-        # Fetch fresh
-        self._fetch_and_cache()
+    def _invalidate(self):
+        """Rebuild lookup indexes and drop memoized searches after the scheme list changes"""
+        CodeListService._search_schemes.cache_clear()
+        self._build_indexes()
+        self._compile_patterns()
+
+    def _build_indexes(self):
+        """Index schemes by ICD and country, and precompute search text"""
+        by_icd = {}
+        for s in self._schemes:
+            # First scheme wins for a repeated ICD, as with the old linear scan
+            by_icd.setdefault(s.get("iso6523"), s)
+
+        active_schemes = [s for s in self._schemes if s.get("state") == "active"]
+        by_country = defaultdict(list)
+        search_index = []
+        for s in active_schemes:
+            by_country[s.get("country", "").upper()].append(s)
+            # NUL-separated so a query cannot match across two fields
+            blob = "\0".join((
+                s.get("iso6523", ""),
+                s.get("schemeid", ""),
+                s.get("country", ""),
+                s.get("scheme-name", ""),
+            )).lower()
+            search_index.append((blob, s))
+        self._by_icd = by_icd
+        self._active_schemes = active_schemes
+        self._by_country = dict(by_country)
+        self._search_index = search_index
+
+    def _compile_patterns(self):
+        """Compile each scheme's identifier regex once per load"""
+        patterns = {}
+        seen = set()
+        for s in self._schemes:
+            icd = s.get("iso6523")
+            # Match get_scheme_by_icd, which returns the first scheme per ICD
+            if icd in seen:
+                continue
+            seen.add(icd)
+            regex_match = _RULES_RE.search(s.get("validation-rules") or "")
+            if not regex_match:
+                continue
+            pattern = regex_match.group(1).strip()
+            try:
+                patterns[icd] = (pattern, re.compile(pattern))
+            except re.error as e:
+                patterns[icd] = (pattern, e)
+        self._compiled_patterns = patterns
 
     def _fetch_and_cache(self):
         """Fetch latest from OpenPeppol"""
         try:
             # First get the index page to find latest version
-            index_resp = requests.get(CODELISTS_BASE, timeout=30)
+            session = _get_session()
+            index_resp = session.get(CODELISTS_BASE, timeout=30)
             index_resp.raise_for_status()
 
             # Extract version from page (look for "v9.4" pattern)
@@ -67,33 +219,63 @@ class CodeListService:
 
             # Fetch the JSON
             url = f"{CODELISTS_BASE}/v{version}/Peppol%20Code%20Lists%20-%20Participant%20identifier%20schemes%20v{version}.json"
-            resp = requests.get(url, timeout=30)
+            cache_file = _schemes_cache_file()
+            meta_file = CACHE_DIR / "meta.json"
+
+            # Revalidate the cached copy instead of downloading it again
+            meta = {}
+            if cache_file.exists() and meta_file.exists():
+                try:
+                    meta = _load_json(meta_file)
+                except Exception:
+                    meta = {}
+            headers = {}
+            if meta.get("source") == url:
+                if meta.get("etag"):
+                    headers["If-None-Match"] = meta["etag"]
+                if meta.get("last_modified"):
+                    headers["If-Modified-Since"] = meta["last_modified"]
+
+            resp = session.get(url, headers=headers, timeout=30)
             resp.raise_for_status()
-            data = resp.json()
 
-            self._schemes = data.get("values", [])
-            self._version = data.get("version", version)
-            self._last_fetch = datetime.now()
+            if resp.status_code == 304:
+                # Unchanged upstream: keep the cached schemes, only bump the fetch time
+                if not self._schemes:
+                    self._schemes = _load_json(cache_file)
+                    CodeListService._cache_mtime = cache_file.stat().st_mtime
+                self._version = meta.get("version", version)
+                self._last_fetch = datetime.now()
+                _dump_json(meta_file, {**meta, "last_fetch": self._last_fetch.isoformat()}, indent=True)
+            else:
+                data = resp.json()
 
-            # Cache it
-            cache_file = CACHE_DIR / "participant_schemes.json"
-            meta_file = CACHE_DIR / "meta.json"
-            cache_file.write_text(json.dumps(self._schemes, indent=2), encoding="utf-8")
-            meta_file.write_text(json.dumps({
-                "version": self._version,
-                "last_fetch": self._last_fetch.isoformat(),
-                "source": url,
-            }), encoding="utf-8")
+                self._schemes = data.get("values", [])
+                self._version = data.get("version", version)
+                self._last_fetch = datetime.now()
+
+                # Cache it (compact; only meta.json is kept readable)
+                _dump_json(cache_file, self._schemes)
+                CodeListService._cache_mtime = cache_file.stat().st_mtime
+                _dump_json(meta_file, {
+                    "version": self._version,
+                    "last_fetch": self._last_fetch.isoformat(),
+                    "source": url,
+                    "etag": resp.headers.get("ETag"),
+                    "last_modified": resp.headers.get("Last-Modified"),
+                }, indent=True)
 
         except Exception as e:
             # If fetch fails, try to load from cache anyway
-            cache_file = CACHE_DIR / "participant_schemes.json"
+            cache_file = _schemes_cache_file()
             if cache_file.exists():
-                self._schemes = json.loads(cache_file.read_text(encoding="utf-8"))
+                self._schemes = _load_json(cache_file)
             else:
                 # Fallback to hardcoded minimal list
                 self._schemes = self._get_fallback_schemes()
 
+        self._invalidate()
+
     def _get_fallback_schemes(self) -> list[dict]:
         """Minimal fallback if everything fails"""
         return [
@@ -120,27 +302,23 @@ class CodeListService:
             "version": self._version,
             "last_fetch": self._last_fetch.isoformat() if self._last_fetch else None,
             "scheme_count": len(self._schemes),
-            "active_count": len([s for s in self._schemes if s.get("state") == "active"]),
+            "active_count": len(self._active_schemes),
         }
 
     def get_all_schemes(self, include_inactive: bool = False) -> list[dict]:
         """Get all schemes, optionally including deprecated/removed"""
         if include_inactive:
             return self._schemes
-        return [s for s in self._schemes if s.get("state") == "active"]
+        return self._active_schemes
 
+    # Lookups return indexed schemes directly; callers must treat them as read-only
     def get_scheme_by_icd(self, icd: str) -> Optional[dict]:
         """Get scheme by ICD code (e.g., '0208')"""
-        for s in self._schemes:
-            if s.get("iso6523") == icd:
-                return s
-        return None
+        return self._by_icd.get(icd)
 
     def get_schemes_by_country(self, country: str) -> list[dict]:
         """Get schemes for a specific country"""
-        country = country.upper()
-        return [s for s in self._schemes
-                if s.get("country", "").upper() == country and s.get("state") == "active"]
+        return self._by_country.get(country.upper(), [])
 
     def validate_identifier(self, icd: str, identifier: str) -> dict:
         """Validate identifier against scheme's regex rules"""
@@ -152,30 +330,44 @@ class CodeListService:
         if not rules:
             return {"valid": True, "warning": "No validation rules defined"}
 
-        # Extract regex from rules
-        regex_match = re.search(r'RegEx:\s*([^\n]+)', rules)
-        if not regex_match:
+        # Regex extracted from rules and compiled at load time
+        compiled_pattern = self._compiled_patterns.get(icd)
+        if compiled_pattern is None:
             return {"valid": True, "warning": "No regex pattern found"}
 
-        pattern = regex_match.group(1).strip()
-        try:
-            if re.fullmatch(pattern, identifier):
-                return {"valid": True, "pattern": pattern}
-            else:
-                return {"valid": False, "error": f"Does not match pattern: {pattern}"}
-        except re.error as e:
-            return {"valid": True, "warning": f"Invalid regex in scheme: {e}"}
+        pattern, compiled = compiled_pattern
+        if isinstance(compiled, re.error):
+            return {"valid": True, "warning": f"Invalid regex in scheme: {compiled}"}
+        if compiled.fullmatch(identifier):
+            return {"valid": True, "pattern": pattern}
+        return {"valid": False, "error": f"Does not match pattern: {pattern}"}
 
     def search_schemes(self, query: str) -> list[dict]:
         """Search schemes by name, country, or ICD"""
-        query = query.lower()
-        results = []
-        for s in self._schemes:
-            if s.get("state") != "active":
-                continue
-            if (query in s.get("iso6523", "").lower() or
-                query in s.get("schemeid", "").lower() or
-                query in s.get("country", "").lower() or
-                query in s.get("scheme-name", "").lower()):
-                results.append(s)
-        return results
+        return self._search_schemes(query.lower())
+
+    @lru_cache(maxsize=256)
+    def _search_schemes(self, query: str) -> list[dict]:
+        return [s for blob, s in self._search_index if query in blob]
+
+
+_service: Optional[CodeListService] = None
+_next_cache_check: float = 0.0
+
+
+def get_codelist_service() -> CodeListService:
+    """
+    Get or create code list service singleton.
+
+    Every CACHE_CHECK_INTERVAL_SECONDS the existing service picks up a cache
+    file rewritten by another worker (e.g. after /refresh); an unchanged file
+    costs a stat, not a parse.
+    """
+    global _service, _next_cache_check
+    if _service is None:
+        _service = CodeListService()
+        _next_cache_check = time.monotonic() + CACHE_CHECK_INTERVAL_SECONDS
+    elif time.monotonic() >= _next_cache_check:
+        _next_cache_check = time.monotonic() + CACHE_CHECK_INTERVAL_SECONDS
+        _service._load_cache()
+    return _service
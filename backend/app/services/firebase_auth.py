@@ -4,8 +4,13 @@ Firebase Authentication Service.
 Provides Firebase Admin SDK integration for user authentication and management.
 Supports both explicit credentials and Application Default Credentials (ADC).
 """
+import asyncio
 import logging
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from operator import attrgetter
+from typing import Any, Callable, Optional
 
 import firebase_admin
 from firebase_admin import auth, credentials, initialize_app
@@ -13,9 +18,30 @@ from firebase_admin.exceptions import FirebaseError
 
 from app.config import settings
 from app.exceptions import PeppolAPIException
+from app.token_cache import token_cache, token_cache_key
 
 logger = logging.getLogger(__name__)
 
+# Maximum identifiers per auth.get_users() call (Admin SDK limit)
+GET_USERS_BATCH_SIZE = 100
+
+# Admin SDK calls block on HTTP; they run here so the event loop stays free
+_sdk_executor = ThreadPoolExecutor(
+    max_workers=settings.firebase_executor_workers or 16, thread_name_prefix="firebase"
+)
+
+
+async def _run_sdk(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking Admin SDK call on the Firebase executor."""
+    return await asyncio.get_running_loop().run_in_executor(
+        _sdk_executor, partial(func, *args, **kwargs)
+    )
+
+
+def clear_verified_token_cache() -> None:
+    """Drop all cached decoded tokens."""
+    token_cache.clear()
+
 
 class FirebaseAuthError(PeppolAPIException):
     """Raised when Firebase authentication operation fails."""
@@ -38,6 +64,49 @@ class FirebaseNotFoundError(PeppolAPIException):
         super().__init__(detail=f"Firebase resource not found: {detail}", status_code=404)
 
 
+# The Admin SDK app, shared by every FirebaseAuthService instance so extra
+# instances (e.g. in tests) never re-read the key file or race initialize_app()
+_firebase_app = None
+_firebase_lock = threading.RLock()
+
+
+@lru_cache(maxsize=4)
+def _load_certificate(path: str):
+    """Parse a service account key file once per path."""
+    return credentials.Certificate(path)
+
+
+_provider_values = attrgetter("uid", "email", "provider_id")
+_PROVIDER_KEYS = ("uid", "email", "provider_id")
+
+
+def _user_metadata(user_record) -> dict:
+    """Timestamps from a UserRecord's metadata."""
+    metadata = user_record.user_metadata
+    return {
+        "creation_timestamp": metadata.creation_timestamp,
+        "last_sign_in_timestamp": metadata.last_sign_in_timestamp,
+        "last_refresh_timestamp": metadata.last_refresh_timestamp,
+    }
+
+
+# Output field -> getter on a UserRecord, in output order
+_USER_FIELD_GETTERS: dict[str, Callable[[Any], Any]] = {
+    "uid": attrgetter("uid"),
+    "email": attrgetter("email"),
+    "email_verified": attrgetter("email_verified"),
+    "display_name": attrgetter("display_name"),
+    "photo_url": attrgetter("photo_url"),
+    "disabled": attrgetter("disabled"),
+    "metadata": _user_metadata,
+    "provider_data": lambda user_record: [
+        dict(zip(_PROVIDER_KEYS, _provider_values(provider)))
+        for provider in user_record.provider_data
+    ],
+    "custom_claims": lambda user_record: user_record.custom_claims or {},
+}
+
+
 class FirebaseAuthService:
     """
     Firebase Authentication Service.
@@ -62,9 +131,13 @@ class FirebaseAuthService:
     """
 
     def __init__(self):
-        """Initialize Firebase Admin SDK."""
+        """Create the service; the Admin SDK is initialized on first use."""
         self._initialized = False
-        self._init_firebase()
+
+    def _ensure_initialized(self) -> None:
+        """Initialize the Admin SDK before the first SDK call."""
+        if not self._initialized:
+            self._init_firebase()
 
     def _init_firebase(self) -> None:
         """
@@ -77,32 +150,38 @@ class FirebaseAuthService:
         Raises:
             FirebaseAuthError: If initialization fails
         """
+        global _firebase_app
+
         if self._initialized:
             return
 
-        try:
-            # Check if already initialized
-            if firebase_admin._apps:
-                logger.info("Firebase Admin SDK already initialized")
+        with _firebase_lock:
+            if _firebase_app is not None:
                 self._initialized = True
                 return
 
-            # Option 1: Explicit credentials file
-            if settings.firebase_credentials_path:
-                logger.info(f"Initializing Firebase with credentials: {settings.firebase_credentials_path}")
-                cred = credentials.Certificate(settings.firebase_credentials_path)
-                initialize_app(cred)
-            # Option 2: Application Default Credentials (ADC)
-            else:
-                logger.info("Initializing Firebase with Application Default Credentials")
-                initialize_app()
+            try:
+                # Check if already initialized
+                if firebase_admin._apps:
+                    logger.info("Firebase Admin SDK already initialized")
+                    _firebase_app = firebase_admin.get_app()
+                # Option 1: Explicit credentials file
+                elif settings.firebase_credentials_path:
+                    logger.info(f"Initializing Firebase with credentials: {settings.firebase_credentials_path}")
+                    cred = _load_certificate(settings.firebase_credentials_path)
+                    _firebase_app = initialize_app(cred)
+                    logger.info("Firebase Admin SDK initialized successfully")
+                # Option 2: Application Default Credentials (ADC)
+                else:
+                    logger.info("Initializing Firebase with Application Default Credentials")
+                    _firebase_app = initialize_app()
+                    logger.info("Firebase Admin SDK initialized successfully")
 
-            self._initialized = True
-            logger.info("Firebase Admin SDK initialized successfully")
+                self._initialized = True
 
-        except Exception as e:
-            logger.error(f"Failed to initialize Firebase: {e}")
-            raise FirebaseAuthError(f"Failed to initialize Firebase: {str(e)}")
+            except Exception as e:
+                logger.error(f"Failed to initialize Firebase: {e}")
+                raise FirebaseAuthError(f"Failed to initialize Firebase: {str(e)}")
 
     async def verify_token(self, id_token: str) -> dict:
         """
@@ -133,9 +212,19 @@ class FirebaseAuthService:
 
         Raises:
             FirebaseAuthError: If token is invalid or expired
+
+        Verified tokens are cached in the shared token cache for up to a
+        minute (never past ``exp``); failures are not cached.
         """
+        key = token_cache_key(id_token)
+        cached = token_cache.get_claims(key)
+        if cached is not None:
+            return cached
+
+        self._ensure_initialized()
         try:
-            decoded_token = auth.verify_id_token(id_token)
+            decoded_token = await _run_sdk(auth.verify_id_token, id_token)
+            token_cache.set_claims(key, decoded_token)
             logger.debug(f"Token verified for user: {decoded_token.get('uid')}")
             return decoded_token
         except auth.InvalidIdTokenError:
@@ -188,8 +277,10 @@ class FirebaseAuthService:
         Raises:
             FirebaseAuthError: If user creation fails
         """
+        self._ensure_initialized()
         try:
-            user_record = auth.create_user(
+            user_record = await _run_sdk(
+                auth.create_user,
                 email=email,
                 password=password,
                 display_name=display_name,
@@ -205,12 +296,13 @@ class FirebaseAuthService:
             logger.error(f"User creation failed: {e}")
             raise FirebaseAuthError(f"Failed to create user: {str(e)}")
 
-    async def get_user_by_uid(self, uid: str) -> dict:
+    async def get_user_by_uid(self, uid: str, fields: frozenset[str] | None = None) -> dict:
         """
         Get user by UID.
 
         Args:
             uid: Firebase user ID
+            fields: Only return these keys (default: all)
 
         Returns:
             dict: User data
@@ -219,9 +311,10 @@ class FirebaseAuthService:
             FirebaseNotFoundError: If user not found
             FirebaseAuthError: If operation fails
         """
+        self._ensure_initialized()
         try:
-            user_record = auth.get_user(uid)
-            return self._user_record_to_dict(user_record)
+            user_record = await _run_sdk(auth.get_user, uid)
+            return self._user_record_to_dict(user_record, fields=fields)
         except auth.UserNotFoundError:
             raise FirebaseNotFoundError(f"User with UID {uid} not found")
         except FirebaseError as e:
@@ -242,8 +335,9 @@ class FirebaseAuthService:
             FirebaseNotFoundError: If user not found
             FirebaseAuthError: If operation fails
         """
+        self._ensure_initialized()
         try:
-            user_record = auth.get_user_by_email(email)
+            user_record = await _run_sdk(auth.get_user_by_email, email)
             return self._user_record_to_dict(user_record)
         except auth.UserNotFoundError:
             raise FirebaseNotFoundError(f"User with email {email} not found")
@@ -251,6 +345,59 @@ class FirebaseAuthService:
             logger.error(f"Failed to get user by email: {e}")
             raise FirebaseAuthError(f"Failed to get user: {str(e)}")
 
+    async def get_users_bulk(
+        self,
+        uids: list[str] | None = None,
+        emails: list[str] | None = None,
+        fields: frozenset[str] | None = None,
+    ) -> tuple[list[dict], list[str]]:
+        """
+        Get many users by UID and/or email in as few round trips as possible.
+
+        Identifiers are sent in batches of 100 (the Admin SDK limit), and the
+        batches are fetched concurrently.
+
+        Args:
+            uids: Firebase user IDs to look up
+            emails: Email addresses to look up
+            fields: Only return these keys per user (default: all)
+
+        Returns:
+            tuple: (users found as dicts, UIDs/emails that matched no user)
+
+        Raises:
+            FirebaseAuthError: If a lookup fails
+        """
+        self._ensure_initialized()
+        identifiers = [auth.UidIdentifier(uid) for uid in uids or ()]
+        identifiers += [auth.EmailIdentifier(email) for email in emails or ()]
+        if not identifiers:
+            return [], []
+
+        batches = [
+            identifiers[i:i + GET_USERS_BATCH_SIZE]
+            for i in range(0, len(identifiers), GET_USERS_BATCH_SIZE)
+        ]
+        try:
+            results = await asyncio.gather(
+                *(_run_sdk(auth.get_users, batch) for batch in batches)
+            )
+        except FirebaseError as e:
+            logger.error(f"Failed to get users: {e}")
+            raise FirebaseAuthError(f"Failed to get users: {str(e)}")
+
+        users = []
+        not_found = []
+        for result in results:
+            users.extend(
+                self._user_record_to_dict(user_record, fields=fields) for user_record in result.users
+            )
+            not_found.extend(
+                identifier.uid if isinstance(identifier, auth.UidIdentifier) else identifier.email
+                for identifier in result.not_found
+            )
+        return users, not_found
+
     async def update_user(
         self,
         uid: str,
@@ -280,6 +427,7 @@ class FirebaseAuthService:
             FirebaseNotFoundError: If user not found
             FirebaseAuthError: If update fails
         """
+        self._ensure_initialized()
         try:
             # Build update kwargs (only include provided values)
             update_kwargs = {}
@@ -296,7 +444,9 @@ class FirebaseAuthService:
             if disabled is not None:
                 update_kwargs["disabled"] = disabled
 
-            user_record = auth.update_user(uid, **update_kwargs)
+            user_record = await _run_sdk(auth.update_user, uid, **update_kwargs)
+            if disabled is not None:
+                token_cache.forget_uid(uid)
             logger.info(f"Updated user: {uid}")
             return self._user_record_to_dict(user_record)
         except auth.UserNotFoundError:
@@ -319,8 +469,10 @@ class FirebaseAuthService:
             FirebaseNotFoundError: If user not found
             FirebaseAuthError: If deletion fails
         """
+        self._ensure_initialized()
         try:
-            auth.delete_user(uid)
+            await _run_sdk(auth.delete_user, uid)
+            token_cache.forget_uid(uid)
             logger.info(f"Deleted user: {uid}")
             return True
         except auth.UserNotFoundError:
@@ -355,8 +507,9 @@ class FirebaseAuthService:
             # Client can use this token to sign in
             ```
         """
+        self._ensure_initialized()
         try:
-            custom_token = auth.create_custom_token(uid, developer_claims=claims)
+            custom_token = await _run_sdk(auth.create_custom_token, uid, developer_claims=claims)
             logger.debug(f"Created custom token for user: {uid}")
             return custom_token.decode("utf-8")
         except FirebaseError as e:
@@ -386,8 +539,10 @@ class FirebaseAuthService:
             )
             ```
         """
+        self._ensure_initialized()
         try:
-            auth.set_custom_user_claims(uid, claims)
+            await _run_sdk(auth.set_custom_user_claims, uid, claims)
+            token_cache.forget_uid(uid)
             logger.info(f"Set custom claims for user: {uid}")
         except auth.UserNotFoundError:
             raise FirebaseNotFoundError(f"User with UID {uid} not found")
@@ -408,8 +563,10 @@ class FirebaseAuthService:
             FirebaseNotFoundError: If user not found
             FirebaseAuthError: If operation fails
         """
+        self._ensure_initialized()
         try:
-            auth.revoke_refresh_tokens(uid)
+            await _run_sdk(auth.revoke_refresh_tokens, uid)
+            token_cache.forget_uid(uid)
             logger.info(f"Revoked refresh tokens for user: {uid}")
         except auth.UserNotFoundError:
             raise FirebaseNotFoundError(f"User with UID {uid} not found")
@@ -417,16 +574,26 @@ class FirebaseAuthService:
             logger.error(f"Failed to revoke refresh tokens: {e}")
             raise FirebaseAuthError(f"Failed to revoke refresh tokens: {str(e)}")
 
-    def _user_record_to_dict(self, user_record) -> dict:
+    def _user_record_to_dict(self, user_record, *, fields: frozenset[str] | None = None) -> dict:
         """
         Convert UserRecord to dictionary.
 
         Args:
             user_record: Firebase UserRecord object
+            fields: Only include these keys (default: all). Nested metadata
+                and provider_data are only built when requested.
 
         Returns:
             dict: User data as dictionary
         """
+        if fields is not None:
+            return {
+                name: getter(user_record)
+                for name, getter in _USER_FIELD_GETTERS.items()
+                if name in fields
+            }
+
+        # Full record: a literal dict beats walking the getter table
         return {
             "uid": user_record.uid,
             "email": user_record.email,
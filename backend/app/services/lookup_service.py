@@ -1,11 +1,19 @@
 """
 Peppol lookup service - wraps logic from peppol_lookup.py
 """
+import asyncio
 import re
+import threading
 import time
 import random
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from itertools import chain
 from urllib.parse import quote
 import requests
+from requests.adapters import HTTPAdapter
 
 PD_BASE = "https://directory.peppol.eu"
 HELGER_BASE = "https://peppol.helger.com/api"
@@ -16,6 +24,116 @@ ISO6523_PREFIX = "iso6523-actorid-upis::"
 DEFAULT_FALLBACK_ICDS = ["0106", "0199", "0060"]
 MAX_TRIES = 5
 BASE_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+# Identifiers looked up at once by lookup_many; kept low to respect Helger's rate limit
+LOOKUP_CONCURRENCY = 4
+# Candidates of one identifier checked in parallel
+CANDIDATE_WORKERS = 8
+# Requests per second sent to Helger, across all threads
+HELGER_RATE_LIMIT = 5
+# Directory/Helger responses shared across requests
+LOOKUP_CACHE_MAX_SIZE = 1024
+LOOKUP_CACHE_TTL_SECONDS = 3600
+
+
+_ISO6523_RE = re.compile(r"\d{4}:.+")
+_WS_RE = re.compile(r"\s+")
+_NON_DIGIT_RE = re.compile(r"\D+")
+
+
+# One HTTP session for all LookupService instances, so keep-alive connections
+# to the directory and Helger are reused across requests. The pool is sized
+# for lookup_many x candidate workers; retries are handled by _get_json.
+_session: requests.Session | None = None
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=0))
+    return _session
+
+
+_candidate_pool = ThreadPoolExecutor(max_workers=CANDIDATE_WORKERS, thread_name_prefix="lookup")
+
+
+class _RateLimiter:
+    """Allow at most ``rate`` calls per ``period`` seconds across threads (sliding window)."""
+
+    def __init__(self, rate: int, period: float = 1.0):
+        self._rate = rate
+        self._period = period
+        self._calls: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a call is allowed, then record it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self._period:
+                    self._calls.popleft()
+                if len(self._calls) < self._rate:
+                    self._calls.append(now)
+                    return
+                wait = self._period - (now - self._calls[0])
+            time.sleep(wait)
+
+
+_helger_limiter = _RateLimiter(HELGER_RATE_LIMIT)
+
+
+class _TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self._ttl, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# URLs include the SML, so one cache serves every LookupService configuration
+_response_cache = _TTLCache(LOOKUP_CACHE_MAX_SIZE, LOOKUP_CACHE_TTL_SECONDS)
+
+
+def _retry_after_seconds(resp: requests.Response) -> float | None:
+    """Seconds the server asked us to wait (Retry-After), if given."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
 
 
 class LookupService:
@@ -28,21 +146,29 @@ class LookupService:
         self.fallback_icds = fallback_icds or DEFAULT_FALLBACK_ICDS
         self.sml = SML_TEST if use_test_sml else SML_PROD
         self.merge_pd = merge_pd_discovery
-        self._session = requests.Session()
-        self._cache: dict[str, dict] = {}
+        self._session = _get_session()
+        self._cache = _response_cache
 
     def _get_json(self, url: str, timeout: int = 30) -> dict:
-        if url in self._cache:
-            return self._cache[url]
+        cached = self._cache.get(url)
+        if cached is not None:
+            return cached
+        # Decorrelated jitter: each wait is drawn from [base, 3 x previous wait],
+        # so clients throttled together spread out instead of retrying in step
+        backoff = BASE_BACKOFF
         for attempt in range(1, MAX_TRIES + 1):
+            if url.startswith(HELGER_BASE):
+                _helger_limiter.acquire()
             resp = self._session.get(url, timeout=timeout)
             if resp.status_code == 429 or 500 <= resp.status_code < 600:
-                wait = BASE_BACKOFF * (2 ** (attempt - 1)) + random.uniform(0, 0.3)
-                time.sleep(wait)
+                if attempt == MAX_TRIES:
+                    break
+                backoff = min(MAX_BACKOFF, random.uniform(BASE_BACKOFF, backoff * 3))
+                time.sleep(min(MAX_BACKOFF, max(backoff, _retry_after_seconds(resp) or 0.0)))
                 continue
             resp.raise_for_status()
             data = resp.json()
-            self._cache[url] = data
+            self._cache.set(url, data)
             return data
         resp.raise_for_status()
         return {}
@@ -51,7 +177,7 @@ class LookupService:
         s = raw.upper().strip()
         if s.startswith("BE"):
             s = s[2:]
-        digits = "".join(c for c in s if c.isdigit())
+        digits = _NON_DIGIT_RE.sub("", s)
         if len(digits) == 9:
             digits = "0" + digits
         if len(digits) == 10:
@@ -59,7 +185,7 @@ class LookupService:
         return None
 
     def _normalize_gln(self, raw: str) -> str | None:
-        digits = "".join(c for c in raw if c.isdigit())
+        digits = _NON_DIGIT_RE.sub("", raw)
         if len(digits) == 13:
             return f"0088:{digits}"
         return None
@@ -68,37 +194,33 @@ class LookupService:
         s = raw.strip()
         if s.startswith(ISO6523_PREFIX):
             return s[len(ISO6523_PREFIX):]
-        if re.fullmatch(r"\d{4}:.+", s):
+        if _ISO6523_RE.fullmatch(s):
             return s
         return None
 
-    def _build_candidates(self, raw: str) -> list[str]:
-        cands = []
+    def _build_candidates(self, raw: str) -> dict[str, None]:
+        # Insertion-ordered set: first occurrence wins, O(1) membership
+        cands: dict[str, None] = {}
         raw_stripped = raw.strip()
 
         # Already normalized
         if v := self._normalize_iso6523(raw_stripped):
-            if v not in cands:
-                cands.append(v)
+            cands.setdefault(v, None)
 
         # GLN
         if v := self._normalize_gln(raw_stripped):
-            if v not in cands:
-                cands.append(v)
+            cands.setdefault(v, None)
 
         # Belgian
-        s = raw_stripped.upper()
-        if s.startswith("BE") or (len("".join(c for c in s if c.isdigit())) in (9, 10)):
+        raw_upper = raw_stripped.upper()
+        if raw_upper.startswith("BE") or len(_NON_DIGIT_RE.sub("", raw_upper)) in (9, 10):
             if v := self._normalize_be(raw_stripped):
-                if v not in cands:
-                    cands.append(v)
+                cands.setdefault(v, None)
 
         # Fallback ICDs
-        raw_clean = re.sub(r"\s+", "", raw_stripped).upper()
+        raw_clean = _WS_RE.sub("", raw_upper)
         for icd in self.fallback_icds:
-            v = f"{icd}:{raw_clean}"
-            if v not in cands:
-                cands.append(v)
+            cands.setdefault(f"{icd}:{raw_clean}", None)
 
         return cands
 
@@ -127,61 +249,71 @@ class LookupService:
         return self._get_json(url)
 
     def lookup(self, raw: str) -> list[dict]:
-        rows = []
-        tried = set()
         candidates = self._build_candidates(raw)
 
         if self.merge_pd:
-            for c in self._pd_search(raw, limit=10):
-                if c not in candidates:
-                    candidates.append(c)
+            candidates.update(dict.fromkeys(self._pd_search(raw, limit=10)))
 
         if not candidates:
             return [{"input": raw, "participant": "", "registered": False,
                      "business_name": "", "country": "", "doc_types": 0, "error": "no_candidates"}]
 
-        for icd_value in candidates:
-            if icd_value in tried:
-                continue
-            tried.add(icd_value)
+        # Candidates are checked in parallel; map() keeps them in order
+        return list(_candidate_pool.map(
+            lambda icd_value: self._check_candidate(raw, icd_value),
+            candidates,
+        ))
 
-            try:
-                reg = self._check_registered(icd_value)
-            except Exception as e:
-                rows.append({"input": raw, "participant": icd_value, "registered": "error",
-                             "business_name": "", "country": "", "doc_types": 0, "error": str(e)})
-                continue
+    def _check_candidate(self, raw: str, icd_value: str) -> dict:
+        """Check one candidate's registration and business card, as a result row."""
+        try:
+            reg = self._check_registered(icd_value)
+        except Exception as e:
+            return {"input": raw, "participant": icd_value, "registered": "error",
+                    "business_name": "", "country": "", "doc_types": 0, "error": str(e)}
 
-            if not reg.get("exists"):
-                rows.append({"input": raw, "participant": icd_value, "registered": False,
-                             "business_name": "", "country": "", "doc_types": 0, "error": ""})
-                continue
+        if not reg.get("exists"):
+            return {"input": raw, "participant": icd_value, "registered": False,
+                    "business_name": "", "country": "", "doc_types": 0, "error": ""}
+
+        # Get business card info
+        bc_name, bc_country, doc_count = "", "", 0
+        try:
+            meta = self._get_smp_meta(icd_value)
+            urls = meta.get("urls", []) or []
+            doc_count = len(urls)
+            bc = meta.get("businessCard", {})
+            ents = bc.get("entity", [])
+            if ents:
+                names = ents[0].get("name", [])
+                if names:
+                    bc_name = names[0].get("name", "")
+                bc_country = ents[0].get("countrycode", "")
+        except Exception:
+            pass
+
+        return {
+            "input": raw,
+            "participant": icd_value,
+            "registered": True,
+            "business_name": bc_name,
+            "country": bc_country,
+            "doc_types": doc_count,
+            "error": "",
+        }
+
+    async def lookup_many(self, ids: list[str], max_concurrency: int = LOOKUP_CONCURRENCY) -> list[dict]:
+        """
+        Look up several identifiers concurrently.
+
+        Each lookup runs in a worker thread (the HTTP client is blocking), with
+        at most ``max_concurrency`` in flight. Rows are returned in input order.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _lookup_one(raw: str) -> list[dict]:
+            async with semaphore:
+                return await asyncio.to_thread(self.lookup, raw)
 
-            # Get business card info
-            bc_name, bc_country, doc_count = "", "", 0
-            try:
-                meta = self._get_smp_meta(icd_value)
-                urls = meta.get("urls", []) or []
-                doc_count = len(urls)
-                bc = meta.get("businessCard", {})
-                ents = bc.get("entity", [])
-                if ents:
-                    names = ents[0].get("name", [])
-                    if names:
-                        bc_name = names[0].get("name", "")
-                    bc_country = ents[0].get("countrycode", "")
-            except Exception:
-                pass
-
-            rows.append({
-                "input": raw,
-                "participant": icd_value,
-                "registered": True,
-                "business_name": bc_name,
-                "country": bc_country,
-                "doc_types": doc_count,
-                "error": "",
-            })
-            time.sleep(0.3)  # rate limit
-
-        return rows
+        batches = await asyncio.gather(*(_lookup_one(raw) for raw in ids))
+        return list(chain.from_iterable(batches))
@@ -7,16 +7,21 @@ Sources:
 - EN 16931: ConnectingEurope/eInvoicing-EN16931
 - phive-rules: phax/phive-rules (complete validation rule sets)
 """
+import fnmatch
 import json
 import logging
+import os
 import shutil
-import urllib.request
+import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 from typing import Optional
 
+import requests
+
 from ..config import settings
 
 logger = logging.getLogger(__name__)
@@ -51,6 +56,94 @@ SOURCES = {
 }
 
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = 60
+
+# One HTTP session for rule downloads, so GitHub's redirect hop and the
+# archive download reuse the same connection
+_session: Optional[requests.Session] = None
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
+def _download(url: str, dest: Path, validators: Optional[dict] = None) -> Optional[dict]:
+    """
+    Stream a download to disk in 1 MiB chunks.
+
+    Args:
+        url: URL to download
+        dest: File to write
+        validators: ETag/Last-Modified from the previous download, if any
+
+    Returns:
+        The response's validators, or None if the server answered 304 Not Modified
+    """
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    with _get_session().get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as resp:
+        if resp.status_code == 304:
+            return None
+        resp.raise_for_status()
+        with dest.open("wb") as f:
+            for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+        return {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+
+
+def _member_parts(info: zipfile.ZipInfo) -> Optional[tuple[str, ...]]:
+    """Path components of a file entry, or None for directories and unsafe names."""
+    if info.is_dir():
+        return None
+    path = PurePosixPath(info.filename)
+    if path.is_absolute() or ".." in path.parts:
+        return None
+    return path.parts
+
+
+def _extract_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo, dest: Path) -> None:
+    """Stream one archive entry straight to its destination."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with zf.open(info) as src, dest.open("wb") as dst:
+        shutil.copyfileobj(src, dst, DOWNLOAD_CHUNK_SIZE)
+
+
+def _count_matching(directory: str, pattern: str, dir_mtimes: dict[str, int]) -> int:
+    """
+    Count files under directory whose name matches pattern, using scandir.
+
+    Records the mtime of every directory walked in dir_mtimes, so callers can
+    tell whether a cached count is still current without walking again.
+    """
+    dir_mtimes[directory] = os.stat(directory).st_mtime_ns
+    count = 0
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith("."):
+                    count += _count_matching(entry.path, pattern, dir_mtimes)
+            elif fnmatch.fnmatchcase(entry.name, pattern):
+                count += 1
+    return count
+
+
+def _mtimes_unchanged(dir_mtimes: dict[str, int]) -> bool:
+    """True if every directory still exists with the recorded mtime."""
+    try:
+        return all(os.stat(path).st_mtime_ns == mtime for path, mtime in dir_mtimes.items())
+    except FileNotFoundError:
+        return False
+
+
 @dataclass
 class SyncStatus:
     source: str
@@ -71,6 +164,10 @@ class RulesSyncService:
         RULES_DIR.mkdir(parents=True, exist_ok=True)
 
         self.status_file = SCHEMAS_DIR / "sync_status.json"
+        # Sources sync in parallel; status updates are read-modify-write
+        self._status_lock = threading.Lock()
+        # (directory, pattern) -> (directory mtime, count); cleared after each sync
+        self._count_cache: dict[tuple[str, str], tuple[dict[str, int], int]] = {}
 
     def get_status(self) -> dict:
         """Get sync status for all sources."""
@@ -96,11 +193,9 @@ class RulesSyncService:
         return result
 
     def sync_all(self) -> dict:
-        """Sync all rule sources."""
-        results = {}
-        for source_id in SOURCES:
-            results[source_id] = self.sync_source(source_id)
-        return results
+        """Sync all rule sources concurrently (they write to separate directories)."""
+        with ThreadPoolExecutor(max_workers=len(SOURCES), thread_name_prefix="rules-sync") as pool:
+            return dict(zip(SOURCES, pool.map(self.sync_source, SOURCES)))
 
     def sync_source(self, source_id: str) -> dict:
         """Sync a specific source."""
@@ -121,12 +216,17 @@ class RulesSyncService:
                 result = {"success": False, "error": "Sync not implemented"}
 
             # Update status
-            self._update_status(source_id, "synced" if result["success"] else "error", result.get("error"))
+            self._count_cache.clear()
+            validators = result.pop("validators", None)
+            self._update_status(
+                source_id, "synced" if result["success"] else "error", result.get("error"), validators
+            )
             return result
 
         except Exception as e:
             error_msg = str(e)
             logger.exception(f"Failed to sync {source_id}")
+            self._count_cache.clear()
             self._update_status(source_id, "error", error_msg)
             return {"success": False, "error": error_msg}
 
@@ -134,147 +234,136 @@ class RulesSyncService:
         """Download UBL 2.1 XSD schemas."""
         url = SOURCES["ubl"]["url"]
         temp_zip = SCHEMAS_DIR / "ubl_temp.zip"
-        temp_dir = SCHEMAS_DIR / "ubl_temp"
 
         try:
             # Download
             logger.info(f"Downloading UBL schemas from {url}")
-            urllib.request.urlretrieve(url, temp_zip)
+            previous = self._previous_validators("ubl")
+            validators = _download(url, temp_zip, previous)
+            if validators is None:
+                logger.info("UBL schemas unchanged since last sync")
+                return {"success": True, "files_copied": 0, "validators": previous}
 
-            # Extract
+            # Extract only xsd/maindoc/*.xsd and the xsd/common tree
+            copied = 0
+            common_dest = XSD_DIR / "common"
+            common_replaced = False
             with zipfile.ZipFile(temp_zip, 'r') as zf:
-                zf.extractall(temp_dir)
+                for info in zf.infolist():
+                    parts = _member_parts(info)
+                    if parts is None or "xsd" not in parts[:-1]:
+                        continue
+                    rest = parts[parts.index("xsd") + 1:]
 
-            # Find and copy XSD files
-            copied = 0
-            for xsd_dir in temp_dir.rglob("xsd"):
-                if xsd_dir.is_dir():
                     # Copy maindoc schemas
-                    maindoc = xsd_dir / "maindoc"
-                    if maindoc.exists():
-                        for xsd in maindoc.glob("*.xsd"):
-                            shutil.copy(xsd, XSD_DIR / xsd.name)
-                            copied += 1
+                    if len(rest) == 2 and rest[0] == "maindoc" and rest[1].endswith(".xsd"):
+                        _extract_member(zf, info, XSD_DIR / rest[1])
+                        copied += 1
 
                     # Copy common schemas
-                    common_src = xsd_dir / "common"
-                    common_dest = XSD_DIR / "common"
-                    if common_src.exists():
-                        if common_dest.exists():
-                            shutil.rmtree(common_dest)
-                        shutil.copytree(common_src, common_dest)
-                        copied += len(list(common_src.glob("*.xsd")))
+                    elif len(rest) >= 2 and rest[0] == "common":
+                        if not common_replaced:
+                            if common_dest.exists():
+                                shutil.rmtree(common_dest)
+                            common_replaced = True
+                        _extract_member(zf, info, common_dest.joinpath(*rest[1:]))
+                        if len(rest) == 2 and rest[1].endswith(".xsd"):
+                            copied += 1
 
-            return {"success": True, "files_copied": copied}
+            return {"success": True, "files_copied": copied, "validators": validators}
 
         finally:
             # Cleanup
             if temp_zip.exists():
                 temp_zip.unlink()
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir)
 
     def _sync_peppol_bis(self) -> dict:
         """Download Peppol BIS 3.0 schematron rules."""
         url = SOURCES["peppol-bis"]["url"]
         temp_zip = SCHEMAS_DIR / "peppol_temp.zip"
-        temp_dir = SCHEMAS_DIR / "peppol_temp"
 
         try:
             # Download
             logger.info(f"Downloading Peppol BIS rules from {url}")
-            urllib.request.urlretrieve(url, temp_zip)
-
-            # Extract
-            with zipfile.ZipFile(temp_zip, 'r') as zf:
-                zf.extractall(temp_dir)
+            previous = self._previous_validators("peppol-bis")
+            validators = _download(url, temp_zip, previous)
+            if validators is None:
+                logger.info("Peppol BIS rules unchanged since last sync")
+                return {"success": True, "files_copied": 0, "validators": previous}
 
-            # Find and copy schematron files
             peppol_dir = SCHEMATRON_DIR / "peppol-bis3"
             peppol_dir.mkdir(exist_ok=True)
 
+            # Extract only the compiled XSLT and .sch files
             copied = 0
-            for root_dir in temp_dir.iterdir():
-                if root_dir.is_dir():
-                    # Look for compiled XSLT in rules directory
-                    rules_dir = root_dir / "rules"
-                    if rules_dir.exists():
-                        for sch_dir in rules_dir.iterdir():
-                            if sch_dir.is_dir():
-                                output_dir = sch_dir / "output"
-                                if output_dir.exists():
-                                    for xslt in output_dir.glob("*.xslt"):
-                                        dest = peppol_dir / xslt.name
-                                        shutil.copy(xslt, dest)
-                                        copied += 1
-
-                    # Also look for .sch files
-                    for sch in root_dir.rglob("*.sch"):
-                        dest = peppol_dir / sch.name
+            with zipfile.ZipFile(temp_zip, 'r') as zf:
+                for info in zf.infolist():
+                    parts = _member_parts(info)
+                    if parts is None or len(parts) < 2:
+                        continue
+                    name = parts[-1]
+
+                    # Compiled XSLT in <root>/rules/<set>/output/
+                    if len(parts) == 5 and parts[1] == "rules" and parts[3] == "output" and name.endswith(".xslt"):
+                        _extract_member(zf, info, peppol_dir / name)
+                        copied += 1
+
+                    # Also .sch files
+                    elif name.endswith(".sch"):
+                        dest = peppol_dir / name
                         if not dest.exists():
-                            shutil.copy(sch, dest)
+                            _extract_member(zf, info, dest)
                             copied += 1
 
-            return {"success": True, "files_copied": copied}
+            return {"success": True, "files_copied": copied, "validators": validators}
 
         finally:
             if temp_zip.exists():
                 temp_zip.unlink()
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir)
 
     def _sync_en16931(self) -> dict:
         """Download EN 16931 validation rules."""
         url = SOURCES["en16931-ubl"]["url"]
         temp_zip = SCHEMAS_DIR / "en16931_temp.zip"
-        temp_dir = SCHEMAS_DIR / "en16931_temp"
 
         try:
             # Download
             logger.info(f"Downloading EN 16931 rules from {url}")
-            urllib.request.urlretrieve(url, temp_zip)
-
-            # Extract
-            with zipfile.ZipFile(temp_zip, 'r') as zf:
-                zf.extractall(temp_dir)
+            previous = self._previous_validators("en16931-ubl")
+            validators = _download(url, temp_zip, previous)
+            if validators is None:
+                logger.info("EN 16931 rules unchanged since last sync")
+                return {"success": True, "files_copied": 0, "validators": previous}
 
-            # Find and copy schematron/xslt files
             en16931_dir = SCHEMATRON_DIR / "en16931"
             en16931_dir.mkdir(exist_ok=True)
 
+            # Extract only the UBL/CII XSLT and .sch files
             copied = 0
-            for root_dir in temp_dir.iterdir():
-                if root_dir.is_dir():
-                    # UBL validation
-                    ubl_xslt = root_dir / "ubl" / "xslt"
-                    if ubl_xslt.exists():
-                        for xslt in ubl_xslt.glob("*.xslt"):
-                            dest = en16931_dir / f"ubl_{xslt.name}"
-                            shutil.copy(xslt, dest)
-                            copied += 1
+            with zipfile.ZipFile(temp_zip, 'r') as zf:
+                for info in zf.infolist():
+                    parts = _member_parts(info)
+                    if parts is None or len(parts) < 2:
+                        continue
+                    name = parts[-1]
 
-                    # CII validation
-                    cii_xslt = root_dir / "cii" / "xslt"
-                    if cii_xslt.exists():
-                        for xslt in cii_xslt.glob("*.xslt"):
-                            dest = en16931_dir / f"cii_{xslt.name}"
-                            shutil.copy(xslt, dest)
-                            copied += 1
+                    # UBL and CII validation in <root>/{ubl,cii}/xslt/
+                    if len(parts) == 4 and parts[1] in ("ubl", "cii") and parts[2] == "xslt" and name.endswith(".xslt"):
+                        _extract_member(zf, info, en16931_dir / f"{parts[1]}_{name}")
+                        copied += 1
 
                     # Also copy .sch files
-                    for sch in root_dir.rglob("*.sch"):
-                        dest = en16931_dir / sch.name
+                    elif name.endswith(".sch"):
+                        dest = en16931_dir / name
                         if not dest.exists():
-                            shutil.copy(sch, dest)
+                            _extract_member(zf, info, dest)
                             copied += 1
 
-            return {"success": True, "files_copied": copied}
+            return {"success": True, "files_copied": copied, "validators": validators}
 
         finally:
             if temp_zip.exists():
                 temp_zip.unlink()
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir)
 
     def _load_status(self) -> dict:
         """Load sync status from file."""
@@ -282,21 +371,64 @@ class RulesSyncService:
             return json.loads(self.status_file.read_text())
         return {}
 
-    def _update_status(self, source_id: str, status: str, error: Optional[str] = None):
+    def _previous_validators(self, source_id: str) -> Optional[dict]:
+        """ETag/Last-Modified of the last successful download of a source."""
+        source_status = self._load_status().get(source_id, {})
+        if source_status.get("status") != "synced":
+            return None
+        return {"etag": source_status.get("etag"), "last_modified": source_status.get("last_modified")}
+
+    def _update_status(
+        self,
+        source_id: str,
+        status: str,
+        error: Optional[str] = None,
+        validators: Optional[dict] = None,
+    ):
         """Update sync status for a source."""
-        all_status = self._load_status()
-        all_status[source_id] = {
-            "last_sync": datetime.now().isoformat(),
-            "status": status,
-            "error": error,
-        }
-        self.status_file.write_text(json.dumps(all_status, indent=2))
+        with self._status_lock:
+            all_status = self._load_status()
+            all_status[source_id] = {
+                "last_sync": datetime.now().isoformat(),
+                "status": status,
+                "error": error,
+                **(validators or {}),
+            }
+            self._write_status(all_status)
+
+    def _write_status(self, all_status: dict) -> None:
+        """Atomically replace the status file, skipping the write if nothing changed."""
+        data = json.dumps(all_status, indent=2)
+        try:
+            if self.status_file.read_text() == data:
+                return
+        except FileNotFoundError:
+            pass
+        # Write a sibling file and rename it over the original, so readers
+        # never see a partially written file
+        tmp_file = self.status_file.with_suffix(".json.tmp")
+        tmp_file.write_text(data)
+        os.replace(tmp_file, self.status_file)
 
     def _count_files(self, directory: Path, pattern: str) -> int:
-        """Count files matching pattern in directory."""
-        if not directory.exists():
+        """
+        Count files matching pattern in directory (recursively, skipping hidden dirs).
+
+        The count is reused while no walked directory's mtime has changed, which
+        also catches files added by a sync in another worker process.
+        """
+        key = (str(directory), pattern)
+        cached = self._count_cache.get(key)
+        if cached is not None and _mtimes_unchanged(cached[0]):
+            return cached[1]
+
+        dir_mtimes: dict[str, int] = {}
+        try:
+            count = _count_matching(str(directory), pattern, dir_mtimes)
+        except FileNotFoundError:
             return 0
-        return len(list(directory.rglob(pattern)))
+        self._count_cache[key] = (dir_mtimes, count)
+        return count
 
 
 # Singleton
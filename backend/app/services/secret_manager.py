@@ -4,10 +4,13 @@ Google Cloud Secret Manager Service.
 Provides secure secret management with GCP Secret Manager.
 Falls back to environment variables when not in GCP.
 """
+import asyncio
 import logging
 import os
-from datetime import datetime, timedelta
-from typing import Optional
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterable, Optional
 
 from google.cloud import secretmanager
 from google.api_core import exceptions as gcp_exceptions
@@ -17,6 +20,22 @@ from app.exceptions import PeppolAPIException
 
 logger = logging.getLogger(__name__)
 
+# Secrets cached per service instance; least recently used are evicted
+SECRET_CACHE_MAX_SIZE = 256
+# Prefetched secrets are refreshed this many seconds before their cache entry expires
+SECRET_REFRESH_MARGIN_SECONDS = 30
+
+
+@lru_cache(maxsize=1)
+def _get_client() -> secretmanager.SecretManagerServiceAsyncClient:
+    """
+    Process-wide async Secret Manager client, so its gRPC channel is set up once.
+
+    grpc.aio channels bind to the event loop they are created on, so this is
+    first called from inside a running coroutine rather than at import time.
+    """
+    return secretmanager.SecretManagerServiceAsyncClient()
+
 
 class SecretManagerError(PeppolAPIException):
     """Raised when Secret Manager operation fails."""
@@ -61,24 +80,26 @@ class SecretManagerService:
         Args:
             cache_ttl_minutes: Cache TTL in minutes (default: 5)
         """
-        self._client: Optional[secretmanager.SecretManagerServiceClient] = None
-        self._cache: dict[str, tuple[str, datetime]] = {}
-        self._cache_ttl = timedelta(minutes=cache_ttl_minutes)
+        self._client: Optional[secretmanager.SecretManagerServiceAsyncClient] = None
+        self._cache: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._cache_ttl_seconds = cache_ttl_minutes * 60
         self._use_secret_manager = settings.use_secret_manager
         self._project_id = settings.gcp_project_id
-
-        if self._use_secret_manager:
-            self._init_client()
+        # Secrets kept warm by the refresh loop started in prefetch()
+        self._refresh_ids: set[str] = set()
+        self._refresh_task: Optional[asyncio.Task] = None
 
     def _init_client(self) -> None:
         """
-        Initialize Secret Manager client.
+        Initialize Secret Manager client on first use.
 
         Raises:
             SecretManagerError: If initialization fails
         """
+        if self._client is not None:
+            return
         try:
-            self._client = secretmanager.SecretManagerServiceClient()
+            self._client = _get_client()
             logger.info("Secret Manager client initialized")
         except Exception as e:
             logger.error(f"Failed to initialize Secret Manager: {e}")
@@ -112,11 +133,14 @@ class SecretManagerService:
             ```
         """
         # Check cache first
-        if secret_id in self._cache:
-            value, cached_at = self._cache[secret_id]
-            if datetime.utcnow() - cached_at < self._cache_ttl:
+        entry = self._cache.get(secret_id)
+        if entry is not None:
+            value, cached_at = entry
+            if time.monotonic() - cached_at < self._cache_ttl_seconds:
+                self._cache.move_to_end(secret_id)
                 logger.debug(f"Retrieved secret from cache: {secret_id}")
                 return value
+            del self._cache[secret_id]
 
         # If Secret Manager disabled, use environment variables
         if not self._use_secret_manager:
@@ -126,14 +150,21 @@ class SecretManagerService:
             logger.debug(f"Retrieved secret from environment: {secret_id}")
             return value
 
-        # Get from Secret Manager
+        return await self._fetch_secret(secret_id, version)
+
+    async def _fetch_secret(self, secret_id: str, version: str = "latest") -> str:
+        """Fetch a secret from Secret Manager and cache it."""
+        self._init_client()
         try:
             name = f"projects/{self._project_id}/secrets/{secret_id}/versions/{version}"
-            response = self._client.access_secret_version(request={"name": name})
+            response = await self._client.access_secret_version(request={"name": name})
             value = response.payload.data.decode("UTF-8")
 
             # Cache the value
-            self._cache[secret_id] = (value, datetime.utcnow())
+            self._cache[secret_id] = (value, time.monotonic())
+            self._cache.move_to_end(secret_id)
+            if len(self._cache) > SECRET_CACHE_MAX_SIZE:
+                self._cache.popitem(last=False)
 
             logger.debug(f"Retrieved secret from Secret Manager: {secret_id}")
             return value
@@ -144,6 +175,50 @@ class SecretManagerService:
             logger.error(f"Failed to get secret: {e}")
             raise SecretManagerError(f"Failed to get secret: {str(e)}")
 
+    async def prefetch(self, secret_ids: Iterable[str]) -> None:
+        """
+        Fetch secrets concurrently and keep them warm.
+
+        With Secret Manager enabled, a background task re-fetches the secrets
+        shortly before their cache entries expire, so ``get_secret`` never
+        waits on a round trip for them. Stop it with ``stop_refresh()``.
+
+        Args:
+            secret_ids: Secret identifiers to fetch
+
+        Raises:
+            SecretNotFoundError: If a secret is not found
+            SecretManagerError: If a fetch fails
+        """
+        secret_ids = list(secret_ids)
+        await asyncio.gather(*(self.get_secret(secret_id) for secret_id in secret_ids))
+
+        if not self._use_secret_manager:
+            return
+        self._refresh_ids.update(secret_ids)
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        """Re-fetch prefetched secrets before their cache entries expire."""
+        interval = max(self._cache_ttl_seconds - SECRET_REFRESH_MARGIN_SECONDS, 1)
+        while True:
+            await asyncio.sleep(interval)
+            secret_ids = list(self._refresh_ids)
+            results = await asyncio.gather(
+                *(self._fetch_secret(secret_id) for secret_id in secret_ids),
+                return_exceptions=True,
+            )
+            for secret_id, result in zip(secret_ids, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"Failed to refresh secret {secret_id}: {result}")
+
+    def stop_refresh(self) -> None:
+        """Cancel the background refresh started by prefetch()."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
     async def create_secret(self, secret_id: str, value: str, labels: dict | None = None) -> dict:
         """
         Create new secret.
@@ -171,11 +246,12 @@ class SecretManagerService:
         if not self._use_secret_manager:
             raise SecretManagerError("Secret Manager is disabled")
 
+        self._init_client()
         try:
             parent = f"projects/{self._project_id}"
 
             # Create secret
-            secret = self._client.create_secret(
+            secret = await self._client.create_secret(
                 request={
                     "parent": parent,
                     "secret_id": secret_id,
@@ -187,7 +263,7 @@ class SecretManagerService:
             )
 
             # Add secret version with value
-            version = self._client.add_secret_version(
+            version = await self._client.add_secret_version(
                 request={
                     "parent": secret.name,
                     "payload": {"data": value.encode("UTF-8")},
@@ -232,11 +308,12 @@ class SecretManagerService:
         if not self._use_secret_manager:
             raise SecretManagerError("Secret Manager is disabled")
 
+        self._init_client()
         try:
             parent = f"projects/{self._project_id}/secrets/{secret_id}"
 
             # Add new secret version
-            version = self._client.add_secret_version(
+            version = await self._client.add_secret_version(
                 request={
                     "parent": parent,
                     "payload": {"data": value.encode("UTF-8")},
@@ -276,9 +353,10 @@ class SecretManagerService:
         if not self._use_secret_manager:
             raise SecretManagerError("Secret Manager is disabled")
 
+        self._init_client()
         try:
             name = f"projects/{self._project_id}/secrets/{secret_id}"
-            self._client.delete_secret(request={"name": name})
+            await self._client.delete_secret(request={"name": name})
 
             # Invalidate cache
             if secret_id in self._cache:
@@ -306,11 +384,12 @@ class SecretManagerService:
         if not self._use_secret_manager:
             raise SecretManagerError("Secret Manager is disabled")
 
+        self._init_client()
         try:
             parent = f"projects/{self._project_id}"
             secrets = []
 
-            for secret in self._client.list_secrets(request={"parent": parent}):
+            async for secret in await self._client.list_secrets(request={"parent": parent}):
                 secrets.append(
                     {
                         "name": secret.name,
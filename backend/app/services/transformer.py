@@ -4,10 +4,13 @@ XSLT Transformer Service - Supports XSLT 1.0, 2.0, and 3.0
 Uses lxml for XSLT 1.0 (fast, no Java dependency)
 Uses saxonche for XSLT 2.0/3.0 (Saxon C library)
 """
+import os
 import re
 import hashlib
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional, Union
 from enum import Enum
 from dataclasses import dataclass
 
@@ -15,6 +18,14 @@ import lxml.etree as ET
 
 from ..config import settings
 
+# blake3 is optional; it hashes stylesheet cache keys faster than hashlib
+try:
+    from blake3 import blake3 as _blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+    _blake3 = None
+
 # Try to import saxonche (optional dependency for XSLT 2.0/3.0)
 try:
     from saxonche import PySaxonProcessor
@@ -39,6 +50,37 @@ class TransformResult:
     processor: Optional[str] = None  # "lxml" or "saxon"
 
 
+# Source documents may be passed as bytes or as a readable binary stream
+XMLSource = Union[bytes, BinaryIO]
+
+# Input documents are untrusted: don't expand entities (XXE) or fetch over the
+# network, and skip building the ID table. Stylesheets keep the default parser
+# since they commonly declare entities such as &nbsp;. lxml parsers must not be
+# used from two threads at once, so each thread gets its own.
+_parser_local = threading.local()
+
+
+def get_xml_parser() -> ET.XMLParser:
+    """Return this thread's hardened parser for input XML documents."""
+    parser = getattr(_parser_local, "parser", None)
+    if parser is None:
+        parser = ET.XMLParser(
+            resolve_entities=False,
+            no_network=True,
+            collect_ids=False,
+            huge_tree=False,
+        )
+        _parser_local.parser = parser
+    return parser
+
+
+def _stylesheet_cache_key(xslt_bytes: bytes) -> bytes:
+    """Content hash for the compiled-stylesheet cache (not security relevant)."""
+    if BLAKE3_AVAILABLE:
+        return _blake3(xslt_bytes).digest(length=16)
+    return hashlib.blake2b(xslt_bytes, digest_size=16).digest()
+
+
 class TransformerService:
     """
     Multi-version XSLT transformer.
@@ -48,8 +90,10 @@ class TransformerService:
     - XSLT 2.0/3.0: Saxon (via saxonche)
     """
 
-    # Cache for compiled stylesheets
-    _lxml_cache: dict[str, ET.XSLT] = {}
+    # Compiled XSLT 1.0 stylesheets, least recently used first
+    LXML_CACHE_SIZE = 64
+    _lxml_cache: "OrderedDict[bytes, ET.XSLT]" = OrderedDict()
+    _lxml_cache_lock = threading.Lock()
     _saxon_processor: Optional["PySaxonProcessor"] = None
 
     def __init__(self, mappers_dir: Optional[Path] = None):
@@ -60,6 +104,9 @@ class TransformerService:
         self.user_mappers_dir = self.mappers_dir / "user_uploads"
         self.user_mappers_dir.mkdir(parents=True, exist_ok=True)
 
+        # Loaded mappers: path -> (mtime_ns, xslt_bytes, version, compiled XSLT 1.0 or None)
+        self._mappers: dict[Path, tuple[int, bytes, XSLTVersion, Optional[ET.XSLT]]] = {}
+
     @classmethod
     def get_saxon_processor(cls) -> Optional["PySaxonProcessor"]:
         """Get or create Saxon processor singleton."""
@@ -69,6 +116,34 @@ class TransformerService:
             cls._saxon_processor = PySaxonProcessor(license=False)
         return cls._saxon_processor
 
+    @classmethod
+    def compile(cls, xslt_bytes: bytes) -> ET.XSLT:
+        """
+        Compile an XSLT 1.0 stylesheet, reusing a cached compilation.
+
+        Compiling is the expensive part of an lxml transform, so stylesheets
+        are kept by content hash and hot mappers stay compiled across requests.
+
+        Raises:
+            lxml.etree.XMLSyntaxError: If the stylesheet is not well-formed
+            lxml.etree.XSLTParseError: If the stylesheet is not valid XSLT
+        """
+        cache_key = _stylesheet_cache_key(xslt_bytes)
+
+        with cls._lxml_cache_lock:
+            compiled = cls._lxml_cache.get(cache_key)
+            if compiled is not None:
+                cls._lxml_cache.move_to_end(cache_key)
+                return compiled
+
+        compiled = ET.XSLT(ET.fromstring(xslt_bytes))
+
+        with cls._lxml_cache_lock:
+            cls._lxml_cache[cache_key] = compiled
+            if len(cls._lxml_cache) > cls.LXML_CACHE_SIZE:
+                cls._lxml_cache.popitem(last=False)
+        return compiled
+
     def detect_xslt_version(self, xslt_content: bytes) -> XSLTVersion:
         """
         Detect XSLT version from stylesheet content.
@@ -95,7 +170,7 @@ class TransformerService:
 
     def transform(
         self,
-        xml_bytes: bytes,
+        xml_bytes: XMLSource,
         xslt_bytes: bytes,
         force_version: Optional[XSLTVersion] = None,
         parameters: Optional[dict] = None,
@@ -104,7 +179,7 @@ class TransformerService:
         Transform XML using XSLT.
 
         Args:
-            xml_bytes: Source XML document
+            xml_bytes: Source XML document, as bytes or a binary stream
             xslt_bytes: XSLT stylesheet
             force_version: Force specific XSLT version (auto-detect if None)
             parameters: Optional XSLT parameters
@@ -127,44 +202,89 @@ class TransformerService:
 
     def transform_with_mapper(
         self,
-        xml_bytes: bytes,
+        xml_bytes: XMLSource,
         mapper_name: str,
         parameters: Optional[dict] = None,
     ) -> TransformResult:
         """
         Transform XML using a named mapper from the mappers directory.
         """
-        # Check built-in mappers first
-        mapper_path = self.mappers_dir / mapper_name
-        if not mapper_path.exists():
-            # Check user uploads
-            mapper_path = self.user_mappers_dir / mapper_name
-            if not mapper_path.exists():
-                return TransformResult(
-                    success=False,
-                    error=f"Mapper not found: {mapper_name}",
-                )
+        # Check built-in mappers first, then user uploads
+        mapper = (
+            self._load_mapper(self.mappers_dir / mapper_name)
+            or self._load_mapper(self.user_mappers_dir / mapper_name)
+        )
+        if mapper is None:
+            return TransformResult(
+                success=False,
+                error=f"Mapper not found: {mapper_name}",
+            )
+
+        xslt_bytes, version, compiled = mapper
+        if compiled is not None:
+            return self._transform_lxml(xml_bytes, xslt_bytes, parameters, compiled=compiled)
+        return self.transform(xml_bytes, xslt_bytes, force_version=version, parameters=parameters)
 
-        xslt_bytes = mapper_path.read_bytes()
-        return self.transform(xml_bytes, xslt_bytes, parameters=parameters)
+    def _load_mapper(self, path: Path) -> Optional[tuple[bytes, XSLTVersion, Optional[ET.XSLT]]]:
+        """
+        Load a mapper file, reusing the previous load until its mtime changes.
+
+        Returns (xslt_bytes, version, compiled) or None if the file is missing.
+        compiled is the lxml stylesheet for valid XSLT 1.0 mappers, else None.
+        """
+        try:
+            mtime = path.stat().st_mtime_ns
+            entry = self._mappers.get(path)
+            if entry is not None and entry[0] == mtime:
+                return entry[1:]
+            xslt_bytes = path.read_bytes()
+        except OSError:
+            return None
+
+        version = self.detect_xslt_version(xslt_bytes)
+        compiled = None
+        if version == XSLTVersion.V1_0:
+            try:
+                compiled = self.compile(xslt_bytes)
+            except (ET.XMLSyntaxError, ET.XSLTParseError):
+                # Left uncompiled so transform() reports the error per call
+                pass
+
+        self._mappers[path] = (mtime, xslt_bytes, version, compiled)
+        return xslt_bytes, version, compiled
+
+    def precompile_mappers(self) -> int:
+        """
+        Load and compile every mapper so first requests skip disk and compile.
+
+        Returns:
+            Number of mappers loaded
+        """
+        count = 0
+        for directory in (self.mappers_dir, self.user_mappers_dir):
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.lower().endswith((".xsl", ".xslt")):
+                        if self._load_mapper(Path(entry.path)) is not None:
+                            count += 1
+        return count
 
     def _transform_lxml(
         self,
-        xml_bytes: bytes,
+        xml_bytes: XMLSource,
         xslt_bytes: bytes,
         parameters: Optional[dict] = None,
+        compiled: Optional[ET.XSLT] = None,
     ) -> TransformResult:
-        """Transform using lxml (XSLT 1.0)."""
+        """Transform using lxml (XSLT 1.0), with an already compiled stylesheet if given."""
         try:
-            # Cache key based on XSLT content hash
-            cache_key = hashlib.md5(xslt_bytes).hexdigest()
-
-            if cache_key not in self._lxml_cache:
-                xslt_doc = ET.fromstring(xslt_bytes)
-                self._lxml_cache[cache_key] = ET.XSLT(xslt_doc)
-
-            transform = self._lxml_cache[cache_key]
-            xml_doc = ET.fromstring(xml_bytes)
+            transform = compiled if compiled is not None else self.compile(xslt_bytes)
+            parser = get_xml_parser()
+            if isinstance(xml_bytes, bytes):
+                xml_doc = ET.fromstring(xml_bytes, parser=parser)
+            else:
+                # Parse straight from the stream without reading it into memory first
+                xml_doc = ET.parse(xml_bytes, parser=parser)
 
             # Apply parameters if provided
             if parameters:
@@ -206,7 +326,7 @@ class TransformerService:
 
     def _transform_saxon(
         self,
-        xml_bytes: bytes,
+        xml_bytes: XMLSource,
         xslt_bytes: bytes,
         version: XSLTVersion,
         parameters: Optional[dict] = None,
@@ -220,6 +340,9 @@ class TransformerService:
                 xslt_version=version,
             )
 
+        if not isinstance(xml_bytes, bytes):
+            xml_bytes = xml_bytes.read()
+
         try:
             xslt_proc = proc.new_xslt30_processor()
 
@@ -279,6 +402,7 @@ class TransformerService:
             raise ValueError("Invalid mapper name")
 
         path.write_bytes(content)
+        self._mappers.pop(path, None)
         return path
 
     def list_mappers(self) -> list[dict]:
@@ -322,6 +446,7 @@ class TransformerService:
                 and path.exists()
                 and path.is_file()):
             path.unlink()
+            self._mappers.pop(path, None)
             return True
         return False
 
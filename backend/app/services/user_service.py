@@ -3,6 +3,8 @@ User Service for Firestore operations.
 
 Provides CRUD operations for user data in Firestore.
 """
+import base64
+import binascii
 import logging
 from datetime import datetime
 from typing import Optional
@@ -40,6 +42,13 @@ class UserAlreadyExistsError(PeppolAPIException):
         super().__init__(detail=f"User already exists: {email}", status_code=409)
 
 
+class InvalidCursorError(PeppolAPIException):
+    """Raised when a pagination cursor cannot be decoded."""
+
+    def __init__(self, cursor: str):
+        super().__init__(detail=f"Invalid cursor: {cursor}", status_code=400)
+
+
 class UserService:
     """
     User Service for Firestore operations.
@@ -69,6 +78,7 @@ class UserService:
     """
 
     COLLECTION_NAME = "users"
+    MAX_PAGE_SIZE = 1000
 
     def __init__(self):
         """Initialize User Service with Firestore client."""
@@ -330,41 +340,129 @@ class UserService:
             logger.error(f"Failed to delete user: {e}")
             raise UserServiceError(f"Failed to delete user: {str(e)}")
 
-    async def list_users(self, limit: int = 100, offset: int = 0) -> list[UserInDB]:
+    async def list_users(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+    ) -> list[UserInDB]:
         """
-        List users with pagination.
+        List users with pagination, newest first.
+
+        Pass the cursor from ``encode_cursor(users[-1])`` to fetch the next page.
+        Cursors seek directly to the next page via the (created_at, uid) index,
+        whereas ``offset`` makes Firestore read and discard every skipped
+        document; it is kept only for existing callers.
 
         Args:
             limit: Maximum number of users to return (default: 100, max: 1000)
-            offset: Number of users to skip (default: 0)
+            cursor: Opaque cursor for the page after a given user (default: None)
+            offset: Deprecated. Number of users to skip (default: 0)
 
         Returns:
             list[UserInDB]: List of users
 
         Raises:
+            InvalidCursorError: If the cursor is malformed
             UserServiceError: If operation fails
         """
-        try:
-            # Enforce max limit
-            limit = min(limit, 1000)
+        return await self._fetch_users(min(limit, self.MAX_PAGE_SIZE), cursor, offset)
+
+    async def list_users_page(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+    ) -> tuple[list[UserInDB], Optional[str]]:
+        """
+        List one page of users along with the cursor for the next page.
+
+        Fetches one user past the page so a full last page does not hand out
+        a cursor to an empty page.
+
+        Args:
+            limit: Maximum number of users to return (default: 100, max: 1000)
+            cursor: Opaque cursor for the page after a given user (default: None)
+            offset: Deprecated. Number of users to skip (default: 0)
+
+        Returns:
+            tuple[list[UserInDB], Optional[str]]: (users, next_cursor), where
+            next_cursor is None on the last page
 
+        Raises:
+            InvalidCursorError: If the cursor is malformed
+            UserServiceError: If operation fails
+        """
+        limit = min(limit, self.MAX_PAGE_SIZE)
+        users = await self._fetch_users(limit + 1, cursor, offset)
+        if len(users) > limit:
+            users = users[:limit]
+            return users, self.encode_cursor(users[-1])
+        return users, None
+
+    async def _fetch_users(self, limit: int, cursor: Optional[str], offset: int) -> list[UserInDB]:
+        """Run the ordered users query; ``limit`` is used as given."""
+        try:
             query = (
                 self._db.collection(self.COLLECTION_NAME)
                 .order_by("created_at", direction=firestore.Query.DESCENDING)
-                .limit(limit)
-                .offset(offset)
+                .order_by("uid", direction=firestore.Query.DESCENDING)
             )
+            if cursor:
+                created_at, uid = self.decode_cursor(cursor)
+                query = query.start_after({"created_at": created_at, "uid": uid})
+            elif offset:
+                query = query.offset(offset)
 
-            docs = await query.get()
+            docs = await query.limit(limit).get()
             users = [UserInDB(**doc.to_dict()) for doc in docs]
 
-            logger.debug(f"Listed {len(users)} users (limit={limit}, offset={offset})")
+            logger.debug("Listed %d users (limit=%d, cursor=%s, offset=%d)", len(users), limit, cursor, offset)
             return users
 
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Failed to list users: {e}")
             raise UserServiceError(f"Failed to list users: {str(e)}")
 
+    @staticmethod
+    def encode_cursor(user: UserInDB) -> str:
+        """
+        Build the list_users cursor that resumes after the given user.
+
+        Args:
+            user: Last user of the current page
+
+        Returns:
+            str: URL-safe opaque cursor
+        """
+        raw = f"{user.uid}|{user.created_at.isoformat()}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, str]:
+        """
+        Parse a cursor produced by encode_cursor.
+
+        Args:
+            cursor: Opaque cursor
+
+        Returns:
+            tuple[datetime, str]: (created_at, uid) of the last user seen
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            uid, _, created_at = raw.rpartition("|")
+            if not uid:
+                raise ValueError("missing uid")
+            return datetime.fromisoformat(created_at), uid
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise InvalidCursorError(cursor)
+
     async def update_last_sign_in(self, uid: str) -> None:
         """
         Update user's last sign-in timestamp.
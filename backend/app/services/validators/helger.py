@@ -2,18 +2,28 @@
 Helger WSDVS Validator - External API-based validation
 Supports many VESIDs: Peppol BIS3, EN16931, ZUGFeRD, XRechnung, etc.
 """
+import asyncio
 import logging
+import threading
 import time
 from typing import Optional
 
+import requests
 import zeep
 import zeep.helpers
+from requests.adapters import HTTPAdapter
+from zeep.transports import Transport
 
 from .base import BaseValidator, ValidationResult, ValidationIssue, Severity
 
 WSDL_URL = "https://peppol.helger.com/wsdvs?wsdl"
 ENDPOINT = "https://peppol.helger.com/wsdvs"
 
+# Keep-alive connections to Helger; enough for concurrent validations so each
+# call reuses a warm TLS connection instead of handshaking again
+HTTP_POOL_SIZE = 16
+HTTP_TIMEOUT_SECONDS = 30
+
 logging.getLogger("zeep").setLevel(logging.ERROR)
 
 
@@ -22,6 +32,12 @@ class HelgerValidator(BaseValidator):
 
     _client = None
     _service = None
+    _session: Optional[requests.Session] = None
+
+    # Process-wide spacing of call starts so concurrent validations (across
+    # requests) still reach Helger at most once per rate_limit_ms
+    _rate_lock = threading.Lock()
+    _next_call_at = 0.0
 
     # Common VESIDs
     VESIDS = {
@@ -38,7 +54,15 @@ class HelgerValidator(BaseValidator):
     def __init__(self, rate_limit_ms: int = 550):
         self.rate_limit_ms = rate_limit_ms
         if HelgerValidator._client is None:
-            HelgerValidator._client = zeep.Client(wsdl=WSDL_URL)
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE))
+            transport = Transport(
+                session=session,
+                timeout=HTTP_TIMEOUT_SECONDS,
+                operation_timeout=HTTP_TIMEOUT_SECONDS,
+            )
+            HelgerValidator._session = session
+            HelgerValidator._client = zeep.Client(wsdl=WSDL_URL, transport=transport)
             HelgerValidator._service = HelgerValidator._client.create_service(
                 "{http://ws.peppol.helger.com/}WSDVSPortBinding", ENDPOINT
             )
@@ -63,6 +87,16 @@ class HelgerValidator(BaseValidator):
     def supported_formats(self) -> list[str]:
         return ["ubl", "cii", "zugferd", "facturx"]
 
+    async def _wait_for_slot(self) -> None:
+        """Reserve the next free call slot and sleep until it starts."""
+        interval = self.rate_limit_ms / 1000.0
+        with HelgerValidator._rate_lock:
+            now = time.monotonic()
+            slot = max(now, HelgerValidator._next_call_at)
+            HelgerValidator._next_call_at = slot + interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
     async def validate(self, xml_bytes: bytes, vesid: Optional[str] = None, **kwargs) -> ValidationResult:
         """
         Validate using Helger WSDVS.
@@ -78,11 +112,13 @@ class HelgerValidator(BaseValidator):
 
         xml_string = xml_bytes.decode("utf-8")
 
-        # Rate limit
-        time.sleep(self.rate_limit_ms / 1000.0)
+        await self._wait_for_slot()
 
         try:
-            report = self._service.validate(XML=xml_string, VESID=vesid, displayLocale="en")
+            # zeep is synchronous; run the SOAP call off the event loop
+            report = await asyncio.to_thread(
+                self._service.validate, XML=xml_string, VESID=vesid, displayLocale="en"
+            )
         except Exception as e:
             return ValidationResult(
                 validator_name=self.name,
@@ -145,6 +181,12 @@ class HelgerValidator(BaseValidator):
             source=self.name,
         )
 
+    @classmethod
+    def close(cls) -> None:
+        """Close pooled connections to Helger."""
+        if cls._session is not None:
+            cls._session.close()
+
     @classmethod
     def get_vesid_list(cls) -> list[dict]:
         """Get list of common VESIDs"""
@@ -2,12 +2,14 @@
 Schematron Validator - Business rule validation using Schematron/XSLT.
 Validates against EN 16931 and Peppol BIS rules.
 """
+import os
 import time
 from typing import Optional
 
 import lxml.etree as ET
 
 from ...config import settings
+from ..transformer import get_xml_parser
 from .base import BaseValidator, ValidationResult, ValidationIssue, Severity
 
 # Schematron files directory from config
@@ -87,7 +89,7 @@ class SchematronValidator(BaseValidator):
         issues = []
 
         try:
-            doc = ET.fromstring(xml_bytes)
+            doc = ET.fromstring(xml_bytes, parser=get_xml_parser())
         except ET.XMLSyntaxError as e:
             return ValidationResult(
                 validator_name=self.name,
@@ -160,14 +162,14 @@ class SchematronValidator(BaseValidator):
             return self._xslt_cache[path]
 
         try:
-            p = Path(path)
-            if not p.is_absolute():
-                p = SCHEMATRON_DIR / path
+            p = path
+            if not os.path.isabs(p):
+                p = os.path.join(settings.schematron_dir_str, path)
 
-            if not p.exists():
+            if not os.path.exists(p):
                 return None
 
-            xslt_doc = ET.parse(str(p))
+            xslt_doc = ET.parse(p)
             xslt = ET.XSLT(xslt_doc)
             self._xslt_cache[path] = xslt
             return xslt
@@ -2,12 +2,14 @@
 XSD Validator - Local XML Schema validation using lxml
 Fast structural validation without external API calls.
 """
+import os
 import time
 from typing import Optional
 
 import lxml.etree as ET
 
 from ...config import settings
+from ..transformer import get_xml_parser
 from .base import BaseValidator, ValidationResult, ValidationIssue, Severity
 
 # XSD files directory from config
@@ -69,7 +71,7 @@ class XSDValidator(BaseValidator):
         issues = []
 
         try:
-            doc = ET.fromstring(xml_bytes)
+            doc = ET.fromstring(xml_bytes, parser=get_xml_parser())
         except ET.XMLSyntaxError as e:
             return ValidationResult(
                 validator_name=self.name,
@@ -141,14 +143,14 @@ class XSDValidator(BaseValidator):
             return self._schema_cache[schema_path]
 
         try:
-            path = Path(schema_path)
-            if not path.is_absolute():
-                path = XSD_DIR / schema_path
+            path = schema_path
+            if not os.path.isabs(path):
+                path = os.path.join(settings.xsd_dir_str, schema_path)
 
-            if not path.exists():
+            if not os.path.exists(path):
                 return None
 
-            schema_doc = ET.parse(str(path))
+            schema_doc = ET.parse(path)
             schema = ET.XMLSchema(schema_doc)
             self._schema_cache[schema_path] = schema
             return schema
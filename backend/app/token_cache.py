@@ -0,0 +1,135 @@
+"""
+Verified ID token cache.
+
+One process-wide cache shared by every auth path (app.firebase,
+FirebaseAuthService.verify_token and the auth middleware), so a single
+hash, TTL policy and invalidation covers them all. Entries are keyed by a
+digest of the raw token and hold the decoded claims plus, once the auth
+middleware has loaded it, the user record.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Decoded claims are served for at most TOKEN_CACHE_TTL_SECONDS, and never
+# closer than TOKEN_EXPIRY_SKEW_SECONDS to the token's own expiry
+TOKEN_CACHE_TTL_SECONDS = 60
+TOKEN_EXPIRY_SKEW_SECONDS = 30
+# Cached users expire sooner, so role or disabled changes made directly in
+# Firestore are picked up quickly
+USER_CACHE_TTL_SECONDS = 30
+TOKEN_CACHE_MAX_SIZE = 10000
+
+
+def hash_token(token: bytes) -> bytes:
+    """SHA-256 digest of a bearer token (hashlib uses SHA-NI where the CPU has it)."""
+    return hashlib.sha256(token).digest()
+
+
+def token_cache_key(token: str, token_hash: Optional[bytes] = None) -> bytes:
+    """
+    Cache key for a token, so raw JWTs are not kept alive as dict keys.
+
+    Pass the digest TokenHashMiddleware stored on the request to skip rehashing.
+    """
+    if token_hash is None:
+        token_hash = hash_token(token.encode())
+    return token_hash[:16]
+
+
+class _Entry:
+    __slots__ = ("expires_at", "claims", "user", "user_expires_at")
+
+    def __init__(self, expires_at: float, claims: dict):
+        self.expires_at = expires_at
+        self.claims = claims
+        self.user: Any = None
+        self.user_expires_at = 0.0
+
+
+def _new_entry(claims: dict) -> Optional[_Entry]:
+    """Build an entry for a decoded token, or None if it is too close to expiry."""
+    exp = claims.get("exp")
+    if not exp:
+        return None
+    ttl = min(float(TOKEN_CACHE_TTL_SECONDS), float(exp) - time.time() - TOKEN_EXPIRY_SKEW_SECONDS)
+    if ttl <= 0:
+        return None
+    return _Entry(time.monotonic() + ttl, claims)
+
+
+class TokenCache:
+    """Thread-safe LRU of verified tokens, dropped by uid on revocation."""
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_MAX_SIZE):
+        self._maxsize = maxsize
+        self._data: "OrderedDict[bytes, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live_entry(self, key: bytes, now: float) -> Optional[_Entry]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if now >= entry.expires_at:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def get_claims(self, key: bytes) -> Optional[dict]:
+        """Return the cached decoded token if the entry is still fresh."""
+        with self._lock:
+            entry = self._live_entry(key, time.monotonic())
+            return entry.claims if entry is not None else None
+
+    def set_claims(self, key: bytes, claims: dict) -> None:
+        """Cache a decoded token, evicting the least recently used entry if full."""
+        entry = _new_entry(claims)
+        if entry is None:
+            return
+        with self._lock:
+            self._store(key, entry)
+
+    def get_user(self, key: bytes) -> Any:
+        """Return the user cached for a token, or None if missing or stale."""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._live_entry(key, now)
+            if entry is None or entry.user is None or now >= entry.user_expires_at:
+                return None
+            return entry.user
+
+    def set_user(self, key: bytes, user: Any, claims: dict) -> None:
+        """Cache the user loaded for a token, caching its claims too if needed."""
+        with self._lock:
+            entry = self._live_entry(key, time.monotonic())
+            if entry is None:
+                entry = _new_entry(claims)
+                if entry is None:
+                    return
+                self._store(key, entry)
+            entry.user = user
+            entry.user_expires_at = min(entry.expires_at, time.monotonic() + USER_CACHE_TTL_SECONDS)
+
+    def _store(self, key: bytes, entry: _Entry) -> None:
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        if len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def forget_uid(self, uid: str) -> None:
+        """Drop every cached token of a user (revoked, disabled, deleted or changed)."""
+        with self._lock:
+            stale = [key for key, entry in self._data.items() if entry.claims.get("uid") == uid]
+            for key in stale:
+                del self._data[key]
+
+    def clear(self) -> None:
+        """Drop all cached tokens."""
+        with self._lock:
+            self._data.clear()
+
+
+token_cache = TokenCache()
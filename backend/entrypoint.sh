@@ -1,6 +1,7 @@
 #!/bin/sh
 # Entrypoint script for Cloud Run
 # Uses PORT environment variable if set, otherwise defaults to 8000
+# uvloop and httptools ship with uvicorn[standard]
 
 PORT=${PORT:-8000}
 
@@ -8,5 +9,7 @@ exec python -m uvicorn app.main:app \
     --host 0.0.0.0 \
     --port "$PORT" \
     --workers 2 \
+    --loop uvloop \
+    --http httptools \
     --proxy-headers \
     --forwarded-allow-ips "*"
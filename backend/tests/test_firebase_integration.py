@@ -3,27 +3,34 @@ Tests for Firebase integration.
 
 Tests Firebase Auth, User Service, Secret Manager, and authentication middleware.
 """
+import asyncio
 import os
+import time
 from datetime import datetime
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi import HTTPException
+from pydantic import ValidationError
 from firebase_admin import auth as firebase_auth
 
-from app.middleware.auth import get_current_user, require_role
+from app.middleware.auth import get_current_user, invalidate_token_cache, require_role
 from app.models.user import Role, UserCreate, UserUpdate
 from app.services.firebase_auth import (
     FirebaseAuthError,
     FirebaseAuthService,
     FirebaseNotFoundError,
+    clear_verified_token_cache,
 )
 from app.services.secret_manager import SecretManagerService, SecretNotFoundError
 from app.services.user_service import (
+    InvalidCursorError,
     UserAlreadyExistsError,
     UserNotFoundError,
     UserService,
 )
+from app.token_cache import token_cache
 
 
 class TestFirebaseAuthService:
@@ -32,6 +39,7 @@ class TestFirebaseAuthService:
     @pytest.fixture
     def auth_service(self):
         """Get Firebase Auth Service instance."""
+        clear_verified_token_cache()
         with patch("app.services.firebase_auth.initialize_app"):
             service = FirebaseAuthService()
             service._initialized = True
@@ -63,6 +71,24 @@ class TestFirebaseAuthService:
 
             assert "Invalid ID token" in str(exc_info.value)
 
+    @pytest.mark.asyncio
+    async def test_verify_token_cached(self, auth_service):
+        """A verified token is served from cache; failures are not cached."""
+        decoded = {"uid": "test_uid", "exp": time.time() + 3600}
+
+        with patch.object(firebase_auth, "verify_id_token", return_value=decoded) as mock_verify:
+            assert await auth_service.verify_token("cached_token") == decoded
+            assert await auth_service.verify_token("cached_token") == decoded
+            mock_verify.assert_called_once()
+
+        with patch.object(
+            firebase_auth, "verify_id_token", side_effect=firebase_auth.InvalidIdTokenError("Invalid token")
+        ) as mock_verify:
+            for _ in range(2):
+                with pytest.raises(FirebaseAuthError):
+                    await auth_service.verify_token("bad_token")
+            assert mock_verify.call_count == 2
+
     @pytest.mark.asyncio
     async def test_create_user_success(self, auth_service):
         """Test successful user creation."""
@@ -121,6 +147,16 @@ class TestFirebaseAuthService:
             assert result["uid"] == "test_uid"
             assert result["email"] == "test@example.com"
 
+    @pytest.mark.asyncio
+    async def test_get_user_by_uid_fields(self, auth_service):
+        """A field projection skips everything not requested."""
+        mock_user_record = MagicMock(uid="test_uid", email="test@example.com")
+
+        with patch.object(firebase_auth, "get_user", return_value=mock_user_record):
+            result = await auth_service.get_user_by_uid("test_uid", fields=frozenset({"uid", "email"}))
+
+        assert result == {"uid": "test_uid", "email": "test@example.com"}
+
     @pytest.mark.asyncio
     async def test_get_user_by_uid_not_found(self, auth_service):
         """Test getting user by UID when not found."""
@@ -128,6 +164,30 @@ class TestFirebaseAuthService:
             with pytest.raises(FirebaseNotFoundError):
                 await auth_service.get_user_by_uid("nonexistent_uid")
 
+    @pytest.mark.asyncio
+    async def test_get_users_bulk_batches_lookups(self, auth_service):
+        """Identifiers are resolved in batches of 100 and not-found ones are reported."""
+        def fake_get_users(identifiers):
+            result = MagicMock()
+            result.users = []
+            for identifier in identifiers:
+                if isinstance(identifier, firebase_auth.UidIdentifier) and identifier.uid != "missing":
+                    record = MagicMock(uid=identifier.uid, custom_claims={}, provider_data=[])
+                    result.users.append(record)
+            result.not_found = [
+                i for i in identifiers
+                if not isinstance(i, firebase_auth.UidIdentifier) or i.uid == "missing"
+            ]
+            return result
+
+        uids = [f"uid{i}" for i in range(150)] + ["missing"]
+        with patch.object(firebase_auth, "get_users", side_effect=fake_get_users) as mock_get_users:
+            users, not_found = await auth_service.get_users_bulk(uids=uids, emails=["nobody@example.com"])
+
+        assert mock_get_users.call_count == 2
+        assert [u["uid"] for u in users] == uids[:150]
+        assert not_found == ["missing", "nobody@example.com"]
+
     @pytest.mark.asyncio
     async def test_delete_user_success(self, auth_service):
         """Test successful user deletion."""
@@ -146,6 +206,107 @@ class TestFirebaseAuthService:
 
             assert result == "custom_token_bytes"
 
+    @pytest.mark.asyncio
+    async def test_sdk_initialized_on_first_use(self):
+        """Constructing the service does no SDK work; the first call initializes it once."""
+        with patch("app.services.firebase_auth.firebase_admin._apps", {}), \
+                patch("app.services.firebase_auth._firebase_app", None), \
+                patch("app.services.firebase_auth.initialize_app") as mock_init:
+            service = FirebaseAuthService()
+            mock_init.assert_not_called()
+
+            with patch.object(firebase_auth, "verify_id_token", return_value={"uid": "test_uid"}):
+                await service.verify_token("token")
+                await service.verify_token("token")
+                # A second instance binds to the same app
+                await FirebaseAuthService().verify_token("token")
+
+            mock_init.assert_called_once()
+
+
+class TestFirebaseTokenCache:
+    """Test verified-token caching in app.firebase."""
+
+    @pytest.fixture(autouse=True)
+    def firebase_app(self):
+        """Pretend Firebase is initialized and start from an empty cache."""
+        from app import firebase
+
+        firebase._load_firebase_admin()
+        token_cache.clear()
+        with patch.object(firebase, "get_firebase_app", return_value=MagicMock()):
+            yield firebase
+        token_cache.clear()
+
+    def test_verified_token_is_cached(self, firebase_app):
+        """Second verification of the same token skips the SDK call."""
+        decoded = {"uid": "test_uid", "exp": time.time() + 3600}
+
+        with patch.object(firebase_app.firebase_auth, "verify_id_token", return_value=decoded) as mock_verify:
+            assert firebase_app.verify_firebase_token("token") == decoded
+            assert firebase_app.verify_firebase_token("token") == decoded
+
+            assert mock_verify.call_count == 1
+
+    def test_nearly_expired_token_is_reverified(self, firebase_app):
+        """Tokens inside the expiry skew window are verified again."""
+        decoded = {"uid": "test_uid", "exp": time.time() + 5}
+
+        with patch.object(firebase_app.firebase_auth, "verify_id_token", return_value=decoded) as mock_verify:
+            firebase_app.verify_firebase_token("token")
+            firebase_app.verify_firebase_token("token")
+
+            assert mock_verify.call_count == 2
+
+
+class TestUserDocumentBatcher:
+    """Test batched user document reads in app.firebase."""
+
+    @staticmethod
+    def _db(*uids):
+        db = MagicMock()
+        snapshots = []
+        for uid in uids:
+            snapshot = MagicMock(exists=True, id=uid)
+            snapshot.to_dict.return_value = {"uid": uid}
+            snapshots.append(snapshot)
+        db.get_all.return_value = iter(snapshots)
+        return db
+
+    def test_concurrent_reads_share_one_get_all(self):
+        """Concurrent lookups are fetched in a single get_all call."""
+        from app import firebase
+
+        batcher = firebase._UserDocumentBatcher()
+        db = self._db("a", "b")
+
+        async def run():
+            return await asyncio.gather(batcher.fetch("a"), batcher.fetch("b"), batcher.fetch("c"))
+
+        with patch.object(firebase, "get_firestore_client", return_value=db):
+            assert asyncio.run(run()) == [{"uid": "a"}, {"uid": "b"}, None]
+
+        db.get_all.assert_called_once()
+
+    def test_batcher_survives_a_new_event_loop(self):
+        """State left behind by a closed loop does not hang later lookups."""
+        from app import firebase
+
+        batcher = firebase._UserDocumentBatcher()
+
+        async def abandon():
+            # Leave a pending read and flush task behind when the loop closes
+            asyncio.get_running_loop().create_task(batcher.fetch("a"))
+            await asyncio.sleep(0)
+
+        with patch.object(firebase, "get_firestore_client", return_value=self._db()):
+            asyncio.run(abandon())
+
+        with patch.object(firebase, "get_firestore_client", return_value=self._db("a")):
+            result = asyncio.run(asyncio.wait_for(batcher.fetch("a"), timeout=1))
+
+        assert result == {"uid": "a"}
+
 
 class TestUserService:
     """Test User Service."""
@@ -289,6 +450,62 @@ class TestUserService:
 
                 assert result is True
 
+    @pytest.mark.asyncio
+    async def test_list_users_with_cursor(self, user_service):
+        """Test cursor pagination seeks past the last user instead of using offset."""
+        created_at = datetime(2025, 12, 3, 10, 0, 0)
+        last_user = MagicMock()
+        last_user.uid = "user|42"
+        last_user.created_at = created_at
+
+        cursor = user_service.encode_cursor(last_user)
+        assert user_service.decode_cursor(cursor) == (created_at, "user|42")
+
+        query = user_service._db.collection.return_value.order_by.return_value.order_by.return_value
+        query.start_after.return_value.limit.return_value.get = AsyncMock(return_value=[])
+
+        assert await user_service.list_users(limit=10, cursor=cursor) == []
+        query.start_after.assert_called_once_with({"created_at": created_at, "uid": "user|42"})
+        query.offset.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_list_users_page_next_cursor(self, user_service):
+        """Test next_cursor is only returned when a further page exists."""
+        def user_doc(n):
+            doc = MagicMock()
+            doc.to_dict.return_value = {
+                "uid": f"uid{n}",
+                "email": f"user{n}@example.com",
+                "role": "user",
+                "created_at": datetime(2025, 12, 3, 10, n, 0),
+                "updated_at": datetime(2025, 12, 3, 10, n, 0),
+                "email_verified": True,
+                "disabled": False,
+            }
+            return doc
+
+        query = user_service._db.collection.return_value.order_by.return_value.order_by.return_value
+        limited = query.limit.return_value
+
+        limited.get = AsyncMock(return_value=[user_doc(n) for n in range(3)])
+        users, next_cursor = await user_service.list_users_page(limit=2)
+        query.limit.assert_called_with(3)
+        assert [u.uid for u in users] == ["uid0", "uid1"]
+        assert user_service.decode_cursor(next_cursor)[1] == "uid1"
+
+        limited.get = AsyncMock(return_value=[user_doc(n) for n in range(2)])
+        users, next_cursor = await user_service.list_users_page(limit=2)
+        assert len(users) == 2
+        assert next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_list_users_invalid_cursor(self, user_service):
+        """Test malformed cursors are rejected with 400."""
+        with pytest.raises(InvalidCursorError) as exc_info:
+            await user_service.list_users(cursor="not-a-cursor")
+
+        assert exc_info.value.status_code == 400
+
 
 class TestSecretManagerService:
     """Test Secret Manager Service."""
@@ -317,10 +534,103 @@ class TestSecretManagerService:
         with pytest.raises(SecretNotFoundError):
             await secret_service.get_secret("NONEXISTENT_SECRET")
 
+    @pytest.mark.asyncio
+    async def test_get_secret_from_secret_manager_cached(self, secret_service):
+        """Test secrets are awaited from the async client and then served from cache."""
+        client = MagicMock()
+        response = MagicMock()
+        response.payload.data = b"secret_value"
+        client.access_secret_version = AsyncMock(return_value=response)
+        secret_service._use_secret_manager = True
+        secret_service._project_id = "test-project"
+
+        with patch("app.services.secret_manager._get_client", return_value=client):
+            assert await secret_service.get_secret("API_KEY") == "secret_value"
+            assert await secret_service.get_secret("API_KEY") == "secret_value"
+
+        client.access_secret_version.assert_awaited_once_with(
+            request={"name": "projects/test-project/secrets/API_KEY/versions/latest"}
+        )
+
+    @pytest.mark.asyncio
+    async def test_prefetch_refreshes_before_expiry(self, secret_service):
+        """Test prefetched secrets are re-fetched in the background before they expire."""
+        client = MagicMock()
+        response = MagicMock()
+        response.payload.data = b"secret_value"
+        client.access_secret_version = AsyncMock(return_value=response)
+        secret_service._use_secret_manager = True
+        secret_service._cache_ttl_seconds = 0
+
+        with patch("app.services.secret_manager._get_client", return_value=client):
+            await secret_service.prefetch(["API_KEY", "DB_PASSWORD"])
+            assert client.access_secret_version.await_count == 2
+            assert secret_service._refresh_task is not None
+            secret_service.stop_refresh()
+
+            # Run one refresh cycle of the loop directly
+            with patch("app.services.secret_manager.asyncio.sleep", AsyncMock()) as mock_sleep:
+                mock_sleep.side_effect = [None, asyncio.CancelledError()]
+                with pytest.raises(asyncio.CancelledError):
+                    await secret_service._refresh_loop()
+
+        assert client.access_secret_version.await_count == 4
+
+
+class TestSecretCache:
+    """Test the TTL cache in front of get_secret."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        """Start each test with an empty secret cache."""
+        from app.secrets import clear_secret_cache
+
+        clear_secret_cache()
+        yield
+        clear_secret_cache()
+
+    def test_secret_cached_until_ttl(self):
+        """Test a cached secret is refetched once its TTL has passed."""
+        from app import secrets
+
+        with patch("app.secrets.get_secret", return_value="value") as mock_get:
+            assert secrets.get_secret_cached("API_KEY") == "value"
+            assert secrets.get_secret_cached("API_KEY") == "value"
+            assert mock_get.call_count == 1
+
+            with patch("app.secrets.time.monotonic", return_value=time.monotonic() + secrets.SECRET_CACHE_TTL_SECONDS + 1):
+                secrets.get_secret_cached("API_KEY")
+            assert mock_get.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_preload_secrets(self):
+        """Test preloading fills the cache for every name."""
+        from app import secrets
+
+        with patch("app.secrets.get_secret", side_effect=lambda name, *args: f"{name}-value") as mock_get:
+            await secrets.preload_secrets(["A", "B"])
+            assert mock_get.call_count == 2
+
+            assert secrets.get_secret_cached("A") == "A-value"
+            assert secrets.get_secret_cached("B") == "B-value"
+            assert mock_get.call_count == 2
+
+
+def _request():
+    """Request stand-in without a TokenHashMiddleware digest."""
+    return SimpleNamespace(state=SimpleNamespace())
+
 
 class TestAuthMiddleware:
     """Test authentication middleware."""
 
+    @pytest.fixture(autouse=True)
+    def clear_user_cache(self):
+        """Start each test with an empty token cache."""
+        token_cache.clear()
+        yield
+        token_cache.clear()
+
     @pytest.mark.asyncio
     async def test_get_current_user_success(self):
         """Test successful user authentication."""
@@ -342,7 +652,7 @@ class TestAuthMiddleware:
                 mock_service.update_last_sign_in = AsyncMock()
                 mock_user_service.return_value = mock_service
 
-                result = await get_current_user(mock_credentials)
+                result = await get_current_user(_request(), mock_credentials)
 
                 assert result.uid == "test_uid"
 
@@ -360,7 +670,7 @@ class TestAuthMiddleware:
             mock_auth.return_value = mock_auth_instance
 
             with pytest.raises(HTTPException) as exc_info:
-                await get_current_user(mock_credentials)
+                await get_current_user(_request(), mock_credentials)
 
             assert exc_info.value.status_code == 401
 
@@ -385,10 +695,97 @@ class TestAuthMiddleware:
                 mock_user_service.return_value = mock_service
 
                 with pytest.raises(HTTPException) as exc_info:
-                    await get_current_user(mock_credentials)
+                    await get_current_user(_request(), mock_credentials)
 
                 assert exc_info.value.status_code == 403
 
+    @pytest.mark.asyncio
+    async def test_get_current_user_cached(self):
+        """Test repeat requests with the same token skip verification until invalidated."""
+        mock_credentials = MagicMock()
+        mock_credentials.credentials = "valid_token"
+
+        mock_user = MagicMock()
+        mock_user.uid = "test_uid"
+        mock_user.disabled = False
+
+        with patch("app.middleware.auth.get_firebase_auth_service") as mock_auth:
+            mock_auth_instance = MagicMock()
+            mock_auth_instance.verify_token = AsyncMock(
+                return_value={"uid": "test_uid", "exp": time.time() + 3600}
+            )
+            mock_auth.return_value = mock_auth_instance
+
+            with patch("app.middleware.auth.get_user_service") as mock_user_service:
+                mock_service = MagicMock()
+                mock_service.get_user = AsyncMock(return_value=mock_user)
+                mock_service.update_last_sign_in = AsyncMock()
+                mock_user_service.return_value = mock_service
+
+                assert await get_current_user(_request(), mock_credentials) is mock_user
+                assert await get_current_user(_request(), mock_credentials) is mock_user
+                assert mock_auth_instance.verify_token.await_count == 1
+                assert mock_service.get_user.await_count == 1
+
+                invalidate_token_cache("test_uid")
+                await get_current_user(_request(), mock_credentials)
+                assert mock_auth_instance.verify_token.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_revoked_user_is_not_served_from_cache(self):
+        """Revoking a user's tokens through the service drops their cached authentication."""
+        mock_credentials = MagicMock()
+        mock_credentials.credentials = "valid_token"
+
+        mock_user = MagicMock()
+        mock_user.uid = "test_uid"
+        mock_user.disabled = False
+
+        with patch("app.middleware.auth.get_firebase_auth_service") as mock_auth, \
+                patch("app.middleware.auth.get_user_service") as mock_user_service:
+            mock_auth_instance = MagicMock()
+            mock_auth_instance.verify_token = AsyncMock(
+                return_value={"uid": "test_uid", "exp": time.time() + 3600}
+            )
+            mock_auth.return_value = mock_auth_instance
+            mock_service = MagicMock()
+            mock_service.get_user = AsyncMock(return_value=mock_user)
+            mock_service.update_last_sign_in = AsyncMock()
+            mock_user_service.return_value = mock_service
+
+            await get_current_user(_request(), mock_credentials)
+
+            with patch("app.services.firebase_auth.initialize_app"):
+                service = FirebaseAuthService()
+                service._initialized = True
+            with patch.object(firebase_auth, "revoke_refresh_tokens"):
+                await service.revoke_refresh_tokens("test_uid")
+
+            await get_current_user(_request(), mock_credentials)
+            assert mock_auth_instance.verify_token.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_last_sign_in_writes_are_pruned(self):
+        """Coalescing entries older than the interval are dropped."""
+        from app.middleware import auth as auth_middleware
+
+        user_service = MagicMock()
+        user_service.update_last_sign_in = AsyncMock()
+        writes = auth_middleware._last_sign_in_writes
+
+        with patch.dict(writes, clear=True), patch.object(auth_middleware.time, "monotonic") as clock:
+            clock.return_value = 1000.0
+            auth_middleware._schedule_last_sign_in_update(user_service, "old_uid")
+            auth_middleware._schedule_last_sign_in_update(user_service, "old_uid")
+            assert list(writes) == ["old_uid"]
+
+            clock.return_value = 1000.0 + auth_middleware.LAST_SIGN_IN_INTERVAL_SECONDS
+            auth_middleware._schedule_last_sign_in_update(user_service, "new_uid")
+            assert list(writes) == ["new_uid"]
+            await asyncio.gather(*auth_middleware._background_tasks)
+
+        assert user_service.update_last_sign_in.await_count == 2
+
     @pytest.mark.asyncio
     async def test_require_role_success(self):
         """Test role requirement with correct role."""
@@ -414,3 +811,24 @@ class TestAuthMiddleware:
             await role_checker(mock_user)
 
         assert exc_info.value.status_code == 403
+
+
+class TestUserModels:
+    """Test user model validation."""
+
+    @pytest.mark.parametrize(
+        "url",
+        ["https://example.com/avatar.png", "http://localhost:8000/a", "https://10.0.0.1/p?s=64"],
+    )
+    def test_photo_url_accepted(self, url):
+        """Test that well-formed http(s) photo URLs pass."""
+        assert UserUpdate(photo_url=url).photo_url == url
+
+    @pytest.mark.parametrize(
+        "url",
+        ["ftp://example.com/a.png", "https://", "example.com/a.png", "https://example.com/a b"],
+    )
+    def test_photo_url_rejected(self, url):
+        """Test that malformed photo URLs are rejected."""
+        with pytest.raises(ValidationError):
+            UserUpdate(photo_url=url)
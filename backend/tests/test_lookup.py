@@ -1,5 +1,8 @@
 """Tests for /api/v1/lookup endpoints."""
 
+import json
+from unittest.mock import MagicMock, patch
+
 import pytest
 
 API_PREFIX = "/api/v1/lookup"
@@ -100,3 +103,171 @@ class TestLookupValidation:
             json={"icd": "0088", "identifier": "1234567890123"}
         )
         assert response.status_code == 200
+
+
+class TestLookupService:
+    """Test LookupService batching."""
+
+    @pytest.fixture(autouse=True)
+    def clear_response_cache(self):
+        """Start each test with an empty shared response cache."""
+        from app.services.lookup_service import _response_cache
+
+        _response_cache.clear()
+        yield
+        _response_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_lookup_many_preserves_input_order(self):
+        """lookup_many returns rows grouped in the order the ids were given."""
+        from app.services.lookup_service import LookupService
+
+        svc = LookupService()
+        with patch.object(svc, "lookup", side_effect=lambda raw: [{"input": raw}, {"input": raw}]):
+            rows = await svc.lookup_many(["a", "b", "c"], max_concurrency=2)
+
+        assert [row["input"] for row in rows] == ["a", "a", "b", "b", "c", "c"]
+
+    def test_get_json_honors_retry_after(self):
+        """Throttled responses are retried, waiting at least Retry-After seconds."""
+        from app.services import lookup_service
+
+        svc = lookup_service.LookupService()
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "2"})
+        ok = MagicMock(status_code=200, headers={})
+        ok.json.return_value = {"exists": True}
+        svc._session = MagicMock()
+        svc._session.get.side_effect = [throttled, ok]
+
+        with patch.object(lookup_service.time, "sleep") as mock_sleep:
+            assert svc._get_json("https://directory.peppol.eu/x") == {"exists": True}
+
+        (wait,), _ = mock_sleep.call_args
+        assert 2 <= wait <= lookup_service.MAX_BACKOFF
+
+        # Served from the shared cache by a fresh instance
+        assert lookup_service.LookupService()._get_json("https://directory.peppol.eu/x") == {"exists": True}
+        assert svc._session.get.call_count == 2
+
+    def test_lookup_checks_candidates_in_order(self):
+        """Candidates are checked in parallel but rows keep candidate order."""
+        from app.services.lookup_service import LookupService
+
+        svc = LookupService(fallback_icds=["0106"], merge_pd_discovery=False)
+        registered = {"0208:0123456789"}
+        with patch.object(svc, "_check_registered",
+                          side_effect=lambda v: {"exists": v in registered}), \
+                patch.object(svc, "_get_smp_meta", return_value={"urls": [1, 2]}):
+            rows = svc.lookup("0123456789")
+
+        assert [row["participant"] for row in rows] == ["0208:0123456789", "0106:0123456789"]
+        assert [row["registered"] for row in rows] == [True, False]
+        assert rows[0]["doc_types"] == 2
+
+
+class TestCodeListService:
+    """Test CodeListService indexes."""
+
+    @pytest.fixture
+    def service(self):
+        """Service with a small in-memory scheme list (no cache file or network)."""
+        from app.services.codelist_service import CodeListService
+
+        svc = object.__new__(CodeListService)
+        svc._schemes = [
+            {"iso6523": "0208", "schemeid": "BE:EN", "country": "BE", "scheme-name": "Enterprise Number",
+             "state": "active", "validation-rules": "RegEx: [0-9]{10}"},
+            {"iso6523": "0088", "schemeid": "GLN", "country": "international", "scheme-name": "Global Location Number",
+             "state": "active"},
+            {"iso6523": "9956", "schemeid": "BE:CBE", "country": "BE", "scheme-name": "Old Belgian Number",
+             "state": "removed"},
+        ]
+        svc._invalidate()
+        return svc
+
+    def test_indexed_lookups(self, service):
+        """ICD, country and search lookups use the prebuilt indexes."""
+        assert service.get_scheme_by_icd("0208")["schemeid"] == "BE:EN"
+        assert service.get_scheme_by_icd("9999") is None
+        assert [s["iso6523"] for s in service.get_schemes_by_country("be")] == ["0208"]
+        assert [s["iso6523"] for s in service.search_schemes("LOCATION")] == ["0088"]
+        assert service.search_schemes("belgian") == []
+        assert [s["iso6523"] for s in service.get_all_schemes()] == ["0208", "0088"]
+        assert service.get_status()["active_count"] == 2
+
+    def test_validate_identifier(self, service):
+        """Identifiers are checked against the scheme's compiled regex."""
+        assert service.validate_identifier("0208", "0123456789")["valid"]
+        assert not service.validate_identifier("0208", "12AB")["valid"]
+        assert "warning" in service.validate_identifier("0088", "123")
+
+    def test_fetch_not_modified_keeps_cache(self, service, tmp_path):
+        """A 304 reply reuses the cached schemes and only rewrites meta.json."""
+        from app.services import codelist_service
+
+        url = (f"{codelist_service.CODELISTS_BASE}/v9.4/Peppol%20Code%20Lists%20-%20"
+               "Participant%20identifier%20schemes%20v9.4.json")
+        (tmp_path / "participant_schemes.json").write_text(json.dumps(service._schemes))
+        (tmp_path / "meta.json").write_text(json.dumps({
+            "version": "9.4", "last_fetch": "2000-01-01T00:00:00", "source": url, "etag": '"abc"',
+        }))
+        index_resp = MagicMock(status_code=200, text="Code lists v9.4")
+        json_resp = MagicMock(status_code=304)
+        session = MagicMock()
+        session.get.side_effect = [index_resp, json_resp]
+
+        with patch.object(codelist_service, "CACHE_DIR", tmp_path), \
+                patch.object(codelist_service, "_get_session", return_value=session):
+            service._fetch_and_cache()
+
+        assert session.get.call_args.kwargs["headers"] == {"If-None-Match": '"abc"'}
+        json_resp.json.assert_not_called()
+        assert service.get_scheme_by_icd("0208")["schemeid"] == "BE:EN"
+        meta = json.loads((tmp_path / "meta.json").read_text())
+        assert meta["etag"] == '"abc"' and not meta["last_fetch"].startswith("2000")
+
+    def test_load_skips_parse_when_cache_unchanged(self, service, tmp_path):
+        """An unchanged cache file (same mtime) is not parsed again."""
+        from datetime import datetime
+        from app.services import codelist_service
+
+        cache_file = tmp_path / "participant_schemes.json"
+        cache_file.write_text(json.dumps(service._schemes))
+        (tmp_path / "meta.json").write_text(json.dumps({
+            "version": "9.4", "last_fetch": datetime.now().isoformat(),
+        }))
+
+        with patch.object(codelist_service, "CACHE_DIR", tmp_path), \
+                patch.object(codelist_service.CodeListService, "_cache_mtime", 0.0), \
+                patch.object(codelist_service, "_load_json", wraps=codelist_service._load_json) as load:
+            service._schemes = []
+            service._load_or_fetch()
+            service._load_or_fetch()
+
+        # meta.json on both calls, the schemes file only on the first
+        assert load.call_count == 3
+        assert service.get_scheme_by_icd("0208")["schemeid"] == "BE:EN"
+
+    def test_get_service_picks_up_rewritten_cache(self, service, tmp_path):
+        """get_codelist_service reloads a cache file rewritten by another worker."""
+        from datetime import datetime
+        from app.services import codelist_service
+
+        (tmp_path / "meta.json").write_text(json.dumps({
+            "version": "9.5", "last_fetch": datetime.now().isoformat(),
+        }))
+        cache_file = tmp_path / "participant_schemes.json"
+        rewritten = [dict(service._schemes[0], **{"schemeid": "BE:NEW"})]
+        cache_file.write_text(json.dumps(rewritten))
+
+        with patch.object(codelist_service, "CACHE_DIR", tmp_path), \
+                patch.object(codelist_service, "_service", service), \
+                patch.object(codelist_service, "_next_cache_check", 0.0), \
+                patch.object(codelist_service.CodeListService, "_cache_mtime", 0.0):
+            assert codelist_service.get_codelist_service() is service
+            assert service.get_scheme_by_icd("0208")["schemeid"] == "BE:NEW"
+
+            # Within the check interval the file is not looked at again
+            cache_file.write_text(json.dumps(service._schemes[:0]))
+            codelist_service.get_codelist_service()
+            assert service.get_scheme_by_icd("0208")["schemeid"] == "BE:NEW"
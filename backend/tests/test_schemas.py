@@ -51,6 +51,74 @@ class TestRulesSyncService:
             count = service._count_files(tmppath, "*.xsd")
             assert count == 2
 
+            # Nested files count; hidden directories are skipped
+            (tmppath / "common").mkdir()
+            (tmppath / "common" / "test3.xsd").touch()
+            (tmppath / ".git").mkdir()
+            (tmppath / ".git" / "ignored.xsd").touch()
+            assert service._count_files(tmppath, "*.xsd") == 3
+
+            # Files added inside an existing subdirectory invalidate the cached count
+            (tmppath / "common" / "test4.xsd").touch()
+            assert service._count_files(tmppath, "*.xsd") == 4
+
+    def test_sync_peppol_bis_extracts_only_rules(self, tmp_path):
+        """Only compiled XSLT and .sch entries are extracted from the archive."""
+        import zipfile
+        from unittest.mock import patch
+        from app.services import rules_sync
+
+        archive = tmp_path / "source.zip"
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("repo-master/rules/sch/output/PEPPOL-EN16931-UBL.xslt", "<xslt/>")
+            zf.writestr("repo-master/rules/sch/PEPPOL-EN16931-UBL.sch", "<schema/>")
+            zf.writestr("repo-master/docs/README.md", "docs")
+            zf.writestr("repo-master/../escape.sch", "<schema/>")
+
+        schemas_dir = tmp_path / "schemas"
+        schematron_dir = schemas_dir / "schematron"
+        schematron_dir.mkdir(parents=True)
+        def fake_download(url, dest, validators=None):
+            dest.write_bytes(archive.read_bytes())
+            return {"etag": '"v1"', "last_modified": None}
+
+        service = rules_sync.RulesSyncService.__new__(rules_sync.RulesSyncService)
+        service.status_file = schemas_dir / "sync_status.json"
+        with patch.object(rules_sync, "SCHEMAS_DIR", schemas_dir), \
+                patch.object(rules_sync, "SCHEMATRON_DIR", schematron_dir), \
+                patch.object(rules_sync, "_download", side_effect=fake_download):
+            result = service._sync_peppol_bis()
+
+        assert result["success"] and result["files_copied"] == 2
+        assert sorted(p.name for p in (schematron_dir / "peppol-bis3").iterdir()) == [
+            "PEPPOL-EN16931-UBL.sch", "PEPPOL-EN16931-UBL.xslt",
+        ]
+        assert not (tmp_path / "escape.sch").exists()
+        assert not (schemas_dir / "peppol_temp.zip").exists()
+
+    def test_sync_source_skips_unchanged_archive(self, tmp_path):
+        """A 304 reply skips extraction and keeps the stored ETag."""
+        import json
+        import threading
+        from unittest.mock import MagicMock, patch
+        from app.services import rules_sync
+
+        service = rules_sync.RulesSyncService.__new__(rules_sync.RulesSyncService)
+        service.status_file = tmp_path / "sync_status.json"
+        service._status_lock = threading.Lock()
+        service._count_cache = {}
+        service.status_file.write_text(json.dumps({"ubl": {"status": "synced", "etag": '"v1"'}}))
+
+        session = MagicMock()
+        session.get.return_value.__enter__.return_value.status_code = 304
+        with patch.object(rules_sync, "SCHEMAS_DIR", tmp_path), \
+                patch.object(rules_sync, "_get_session", return_value=session):
+            result = service.sync_source("ubl")
+
+        assert result == {"success": True, "files_copied": 0}
+        assert session.get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+        assert json.loads(service.status_file.read_text())["ubl"]["etag"] == '"v1"'
+
 
 class TestSchemasEndpoints:
     """Test schema API endpoints."""
@@ -124,6 +192,35 @@ class TestValidatorIntegration:
         assert info["type"] == "helger"
         assert info["is_local"] is False
 
+    @pytest.mark.asyncio
+    async def test_helger_spaces_concurrent_calls(self):
+        """Concurrent Helger validations start at least rate_limit_ms apart."""
+        import asyncio
+        import time
+        from unittest.mock import MagicMock, patch
+
+        from app.services.validators import HelgerValidator
+
+        starts = []
+
+        def fake_validate(**kwargs):
+            starts.append(time.monotonic())
+            return {"Result": []}
+
+        service = MagicMock()
+        service.validate.side_effect = fake_validate
+        validator = HelgerValidator.__new__(HelgerValidator)
+        validator.rate_limit_ms = 50
+
+        with patch.object(HelgerValidator, "_service", service), \
+                patch.object(HelgerValidator, "_next_call_at", 0.0):
+            await asyncio.gather(*(validator.validate(b"<Invoice/>") for _ in range(4)))
+
+        starts.sort()
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        assert len(gaps) == 3
+        assert all(gap >= 0.045 for gap in gaps)
+
     def test_registry_has_all_validators(self):
         """Validator registry has all validators."""
         from app.services.validators import ValidatorRegistry
@@ -101,6 +101,59 @@ class TestTransformerService:
         result = transformer.transform(xml, xslt)
         assert not result.success
 
+    def test_transform_does_not_expand_external_entities(self, tmp_path):
+        """External entities in input XML are not resolved (XXE)."""
+        from app.services.transformer import get_transformer
+
+        secret = tmp_path / "secret.txt"
+        secret.write_text("top-secret")
+
+        xml = f'''<?xml version="1.0"?>
+        <!DOCTYPE root [<!ENTITY xxe SYSTEM "{secret.as_uri()}">]>
+        <root><item>&xxe;</item></root>'''.encode()
+        xslt = b'''<?xml version="1.0"?>
+        <xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+            <xsl:template match="/"><out><xsl:value-of select="//item"/></out></xsl:template>
+        </xsl:stylesheet>'''
+
+        result = get_transformer().transform(xml, xslt)
+        assert result.success
+        assert b"top-secret" not in result.output
+
+    def test_compile_reuses_cached_stylesheet(self):
+        """Compiling the same XSLT twice returns the cached stylesheet."""
+        from app.services.transformer import TransformerService
+
+        xslt = b'''<?xml version="1.0"?>
+        <xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+            <xsl:template match="/"><cached/></xsl:template>
+        </xsl:stylesheet>'''
+
+        compiled = TransformerService.compile(xslt)
+        assert TransformerService.compile(bytes(xslt)) is compiled
+        assert len(TransformerService._lxml_cache) <= TransformerService.LXML_CACHE_SIZE
+
+    def test_mapper_reloaded_when_file_changes(self, tmp_path):
+        """Named mappers are loaded once and reloaded after the file changes."""
+        import os
+        from app.services.transformer import TransformerService
+
+        transformer = TransformerService(mappers_dir=tmp_path)
+        mapper = tmp_path / "m.xsl"
+        template = '''<?xml version="1.0"?>
+        <xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+            <xsl:template match="/"><{tag}/></xsl:template>
+        </xsl:stylesheet>'''
+        mapper.write_text(template.format(tag="first"))
+
+        assert transformer.precompile_mappers() == 1
+        assert b"<first/>" in transformer.transform_with_mapper(b"<root/>", "m.xsl").output
+
+        mapper.write_text(template.format(tag="second"))
+        stat = mapper.stat()
+        os.utime(mapper, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert b"<second/>" in transformer.transform_with_mapper(b"<root/>", "m.xsl").output
+
     def test_list_mappers(self):
         """List mappers returns correct structure."""
         from app.services.transformer import get_transformer
@@ -203,6 +256,28 @@ class TestTransformEndpoints:
         assert result["success"]
         assert result["processor"] == "lxml"
 
+    def test_transform_inline_multipart(self, client, sample_ubl_invoice):
+        """POST /transform/inline?response_format=multipart returns raw XML parts."""
+        xslt = b'''<?xml version="1.0"?>
+        <xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+            <xsl:template match="/"><inline-result/></xsl:template>
+        </xsl:stylesheet>'''
+
+        files = [
+            ("files", ("invoice.xml", io.BytesIO(sample_ubl_invoice), "application/xml")),
+            ("xslt", ("transform.xsl", io.BytesIO(xslt), "application/xml")),
+        ]
+        response = client.post(
+            f"{API_PREFIX}/transform/inline",
+            params={"response_format": "multipart"},
+            files=files,
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("multipart/mixed; boundary=")
+        assert b'filename="invoice_transformed.xml"' in response.content
+        assert b"<inline-result/>" in response.content
+
     def test_transform_zip(self, client):
         """POST /transform/zip transforms XMLs from ZIP."""
         import zipfile
@@ -230,6 +305,10 @@ class TestTransformEndpoints:
         assert response.status_code == 200
         assert response.headers["content-type"] == "application/zip"
 
+        with zipfile.ZipFile(std_io.BytesIO(response.content)) as out_zf:
+            assert set(out_zf.namelist()) == {"document_transformed.xml", "_results.json"}
+            assert b"<zip-result/>" in out_zf.read("document_transformed.xml")
+
     def test_transform_zip_no_xslt(self, client):
         """POST /transform/zip without XSLT should fail."""
         import zipfile
@@ -2,6 +2,8 @@
 
 import base64
 import io
+import json
+import zipfile
 
 import pytest
 
@@ -145,6 +147,33 @@ class TestTransformation:
         # Should return 404 for missing mapper
         assert response.status_code == 404
 
+    def test_transform_zip_records_corrupt_entry(self, client):
+        """POST /api/v1/validation/transform/zip reports unreadable entries in _results.json."""
+        xslt = (
+            b'<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">'
+            b'<xsl:template match="/"><out/></xsl:template></xsl:stylesheet>'
+        )
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+            zf.writestr("mapper.xsl", xslt)
+            zf.writestr("good.xml", b"<a/>")
+            zf.writestr("bad.xml", b"<broken-entry-payload/>")
+        data = bytearray(buf.getvalue())
+        # Flip a byte of bad.xml's stored data so its CRC check fails on read
+        offset = data.index(b"broken-entry-payload")
+        data[offset] ^= 0xFF
+
+        files = [("file", ("batch.zip", io.BytesIO(bytes(data)), "application/zip"))]
+        response = client.post(f"{API_PREFIX}/transform/zip", files=files)
+        assert response.status_code == 200
+
+        with zipfile.ZipFile(io.BytesIO(response.content)) as out:
+            results = {r["input"]: r for r in json.loads(out.read("_results.json"))}
+            assert "good_transformed.xml" in out.namelist()
+
+        assert results["good.xml"]["success"] is True
+        assert results["bad.xml"]["success"] is False
+
 
 class TestHealthEndpoints:
     """Test health and root endpoints."""